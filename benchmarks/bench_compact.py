@@ -0,0 +1,65 @@
+import argparse
+import gc
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+from app.compact import load_compact, load_repository
+from app.reader import MotionFileReader
+from app.repository import TOURNAMENT_LIST_PATH
+from payloads import synthetic_motions_file
+
+def measure(name: str, load: Callable[[], Any]) -> tuple[Any, float, float, float]:
+    # Timed on its own, then loaded again for the memory still held by the result and the peak while loading
+    gc.collect()
+    start = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<16} {elapsed * 1000:>10.1f} ms {retained / 1024 / 1024:>10.1f} MB retained {peak / 1024 / 1024:>10.1f} MB peak")
+    return result, elapsed, retained, peak
+
+def load_dicts(path: Path) -> dict[str, list]:
+    # The whole repository as TypedDicts, the way it is loaded today
+    if path.is_file():
+        return {path.name: list(MotionFileReader(path).iter_tournament_groups())}
+    tournament_list = json.loads((path/TOURNAMENT_LIST_PATH).read_text())
+    files: dict[str, list] = {}
+    for tournament in tournament_list:
+        if tournament["url"] not in files and (path/tournament["url"]).is_file():
+            files[tournament["url"]] = list(MotionFileReader(path/tournament["url"]).iter_tournament_groups())
+    return files
+
+def load_compacts(path: Path) -> dict[str, list]:
+    return {path.name: load_compact(path)} if path.is_file() else load_repository(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of the whole corpus as TypedDicts against the compact classes of app.compact")
+    parser.add_argument("--dir", type=lambda x: Path(x).resolve(), help="A motions repository to load instead of a generated motions file")
+    parser.add_argument("--lines", type=int, default=500_000, help="Lines of the generated motions file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path: Path = args.dir
+        if path is None:
+            path = Path(tmp)/"motions.txt"
+            synthetic_motions_file(random.Random(args.seed), path, args.lines)
+            print(f"{path.stat().st_size / 1024 / 1024:.1f} MB, {args.lines} lines")
+        dicts, dict_time, dict_retained, dict_peak = measure("TypedDict", lambda: load_dicts(path))
+        compacts, compact_time, compact_retained, compact_peak = measure("compact", lambda: load_compacts(path))
+        motions = sum(len(round.motions) for groups in compacts.values() for group in groups for year in group.tournaments for round in year.rounds)
+        print(f"{motions} motions: {dict_retained / max(motions, 1):.0f} B per motion as TypedDicts, {compact_retained / max(motions, 1):.0f} B compact")
+        print(f"{dict_retained / compact_retained:.1f}x less memory retained, {dict_peak / compact_peak:.1f}x lower peak, {compact_time / dict_time:.2f}x the load time")
+        converted = {url: [group.to_dict() for group in groups] for url, groups in compacts.items()}
+        assert converted == dicts, "Compact round trip differs"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from app import session, api_stats
+from app.app import AutoMotionsBatchApp
+from app.interface import CLIInterface
+from standin import add_server_arguments, server_from_arguments
+
+def percentiles(values: list[float]) -> str:
+    if not values:
+        return "-"
+    values = sorted(values)
+    def at(q: float) -> float:
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000
+    return f"p50 {at(0.5):.1f} ms, p95 {at(0.95):.1f} ms, p99 {at(0.99):.1f} ms, max {values[-1] * 1000:.1f} ms"
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end fetch throughput and tail latency against the local Tabbycat stand-in")
+    parser.add_argument("--workers", type=int, default=8, help="Tournaments fetched at once, as in `automotions batch --workers`")
+    parser.add_argument("--rounds", type=int, default=1, help="Times every tournament is fetched")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--stats", type=str, choices=api_stats.StatsEngineList, default="auto", help="Statistics engine; api needs --results")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--retries", type=int, default=session.DEFAULT_RETRIES)
+    parser.add_argument("--backoff", type=float, default=0.05)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    api_stats.configure(args.stats)
+    session.configure(timeout=args.timeout, retries=args.retries, backoff=args.backoff, pool_size=args.workers * 3)
+    # Time to response headers of every request, including retries
+    request_times: list[float] = []
+    lock = threading.Lock()
+    def record(response: requests.Response, *_, **__):
+        with lock:
+            request_times.append(response.elapsed.total_seconds())
+    session.get_session().hooks["response"].append(record)
+    with server_from_arguments(args) as server:
+        urls = [server.tournament_url(slug) for slug in server.tournaments] * args.rounds
+        print(f"{len(server.tournaments)} tournaments on {server.url}, {len(urls)} fetches with {args.workers} workers")
+        def fetch(url: str) -> float:
+            start = time.perf_counter()
+            AutoMotionsBatchApp._fetch(CLIInterface(url, 0, "bench"), args.stream)
+            return time.perf_counter() - start
+        tournament_times: list[float] = []
+        errors: dict[str, int] = {}
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(fetch, url) for url in urls]
+            for future in as_completed(futures):
+                try:
+                    tournament_times.append(future.result())
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+        elapsed = time.perf_counter() - start
+        print(f"{len(tournament_times)} fetched, {sum(errors.values())} failed in {elapsed:.2f} s")
+        print(f"throughput  {len(tournament_times) / elapsed:.1f} tournaments/s, {server.stats['requests'] / elapsed:.1f} requests/s")
+        print(f"tournament  {percentiles(tournament_times)}")
+        print(f"request     {percentiles(request_times)}")
+        if tournament_times:
+            print(f"mean        {statistics.fmean(tournament_times) * 1000:.1f} ms per tournament")
+        print(f"server      {', '.join(f'{key}: {count}' for key, count in sorted(server.stats.items()))}")
+        if errors:
+            print(f"errors      {', '.join(f'{name}: {count}' for name, count in sorted(errors.items()))}")
+
+if __name__ == "__main__":
+    main()
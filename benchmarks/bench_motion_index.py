@@ -0,0 +1,54 @@
+import argparse
+import json
+import time
+import requests
+from app.motions import MotionManager
+from app.interface.types import TabbycatContext
+
+class OfflineMotionManager(MotionManager):
+    def __init__(self, payloads: dict[str, list[dict]]):
+        super().__init__(TabbycatContext(base_url="http://localhost/", tournament_slug="bench", tournament_name="Bench", tournament_type=None), quiet=True)
+        self.payloads = payloads
+
+    def _get(self, path: str) -> requests.Response:
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(self.payloads[path.rstrip("/").split("/")[-1]]).encode()
+        return response
+
+def make_payloads(n_rounds: int, motions_per_round: int) -> dict[str, list[dict]]:
+    base = "http://localhost/api/v1/tournaments/bench"
+    rounds = [{"url": f"{base}/rounds/{i}", "seq": i, "name": f"Round {i}"} for i in range(1, n_rounds+1)]
+    motions = [
+        {"url": f"{base}/motions/{i}-{j}", "text": f"THW motion {i}-{j}", "reference": f"{i}-{j}", "info_slide": "", "rounds": [{"round": f"{base}/rounds/{i}", "seq": j}]}
+        for i in range(1, n_rounds+1) for j in range(1, motions_per_round+1)
+    ]
+    return {"rounds": rounds, "motions": motions}
+
+def main():
+    parser = argparse.ArgumentParser(description="Round/motion lookup cost as tournaments grow")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 800])
+    parser.add_argument("--motions", type=int, default=3, help="Motions per round")
+    args = parser.parse_args()
+    print(f"{'rounds':>8} {'links':>8} {'indexed µs/link':>16} {'linear µs/link':>16}")
+    for n_rounds in args.sizes:
+        manager = OfflineMotionManager(make_payloads(n_rounds, args.motions))
+        manager._fetch_api()
+        links = [round_data["round"] for motion in manager.payloads["motions"] for round_data in motion["rounds"]]
+        names = [round["name"] for round in manager.rounds]
+        start = time.perf_counter()
+        for url in links:
+            manager.rounds_by_url[url]
+        for name in names:
+            manager.rounds_by_name[name]
+        indexed = (time.perf_counter() - start) / (len(links) + len(names)) * 1e6
+        start = time.perf_counter()
+        for url in links:
+            next(round for round in manager.rounds if round["url"] == url)
+        for name in names:
+            next(round for round in manager.rounds if round["name"] == name)
+        linear = (time.perf_counter() - start) / (len(links) + len(names)) * 1e6
+        print(f"{n_rounds:>8} {len(links):>8} {indexed:>16.3f} {linear:>16.3f}")
+
+if __name__ == "__main__":
+    main()
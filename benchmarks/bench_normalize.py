@@ -0,0 +1,69 @@
+import argparse
+import random
+import re
+import time
+from app.utils import SUBSTRINGS_MOTION, SUBSTRINGS_INFO, SUBSTRINGS_ROUND, parse_motion, parse_info, parse_round
+
+def legacy(rules: list[tuple[str, str]], text: str) -> str:
+    for sub in rules:
+        text = re.sub(sub[0], sub[1], text, flags=re.IGNORECASE)
+    return text.strip()
+
+TOKENS = [
+    "this house", "This House", "th ", "TH", "believes that", "would", "supports", "opposes", "prefers", "regrets",
+    "“", "”", "‘", "’", "(", ")", " (", " )", "&amp;", "&nbsp;", "&quot;", "&amp;nbsp;", "&amp;quot;", "<p>", "</p>", "<b>", "<",  ">",
+    " ", "  ", "\n", "\r\n", "\n\n", ".", "x", "policy", "Round ", "round", "open", "Open", "novice", "grand final", "semi-finals", "semis",
+    "double octo-finals", "octofinals", "quarter finals", "quarters", "final", "partial ", "pre-", "オープン", "部門", "準々々々々決勝",
+    "準々々々決勝", "準々決勝", "準決勝", "決勝", "ラウンド", "々", "準", "high school",
+]
+
+def random_text(rng: random.Random, n: int) -> str:
+    return "".join(rng.choice(TOKENS) for _ in range(n))
+
+def make_corpus(rng: random.Random, size: int) -> list[str]:
+    motions = [
+        "This house believes that states should ban “gain of function” research (GoF).",
+        "TH regrets the rise of  influencer culture &amp; its effect on children",
+        "This House would  prefer a world where ‘neutral’ media did not exist.",
+        "THW abolish the monarchy",
+    ]
+    return [rng.choice(motions) + f" {i}" for i in range(size)]
+
+def bench(name: str, fn, texts: list[str]) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    elapsed = (time.perf_counter() - start) / len(texts) * 1e6
+    print(f"{name:<28} {elapsed:>10.2f} µs/call")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalization pipeline speed and equivalence with the per-rule re.sub loop")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--check", type=int, default=20000, help="Number of random inputs checked for identical output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    # Equivalence
+    for _ in range(args.check):
+        text = random_text(rng, rng.randint(1, 12))
+        for rules, fn in ((SUBSTRINGS_MOTION, parse_motion), (SUBSTRINGS_INFO, parse_info), (SUBSTRINGS_ROUND, parse_round)):
+            assert fn.__wrapped__(text) == legacy(rules, text), f"{fn.__name__} differs for {text!r}"
+    print(f"Output identical on {args.check} random inputs")
+    # Speed
+    motions = make_corpus(rng, args.size)
+    infos = [f"<p>Info slide {i}</p>\r\n\r\n<p>“Gain of function”  research &amp; more (GoF) &nbsp;</p>" for i in range(args.size)]
+    ratios = []
+    for label, rules, fn, texts in (("parse_motion", SUBSTRINGS_MOTION, parse_motion, motions), ("parse_info", SUBSTRINGS_INFO, parse_info, infos)):
+        base = bench(f"{label} (re.sub loop)", lambda text: legacy(rules, text), texts)
+        compiled = bench(f"{label} (pipeline)", fn.__wrapped__, texts)
+        # Repeated inputs, as when a motions file is rewritten
+        repeated = texts[:2000] * (len(texts) // 2000 or 1)
+        fn.cache_clear()
+        memo = bench(f"{label} (pipeline, memo)", fn, repeated)
+        ratios.append((label, base / compiled, base / memo))
+    for label, compiled, memo in ratios:
+        print(f"{label}: {compiled:.1f}x faster, {memo:.1f}x on repeated input")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import argparse
+import json
+import random
+import re
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from app.reader import MotionFileReader
+from app.types import TournamentGroup
+from app.utils import tournament_year_to_lines
+
+class LegacyMotionFileReader(MotionFileReader):
+    # Previous behaviour: whole file split into lines, regex indent and recursive resolution
+    def iter_lines(self):
+        return iter(self.path.read_text().split("\n"))
+
+    @staticmethod
+    def _extract_line(line: str) -> tuple[int, str]:
+        indent = re.match(r"^(?:\s{4}|\t)*", line).group() # type: ignore
+        def _iter(indent_str: str) -> int:
+            if not indent_str:
+                return 0
+            if indent_str[0] == "\t":
+                return 1 + _iter(indent_str[1:])
+            assert indent_str.startswith("    "), "Invalid indent string"
+            return 4 + _iter(indent_str[4:])
+        return _iter(indent), line.strip()
+
+    def tournament_groups_to_lines(self, tournament_groups: list[TournamentGroup]) -> list[str]:
+        # Every tournament normalized again
+        lines: list[str] = []
+        for tg in tournament_groups:
+            lines.append(f"{tg['name']}")
+            for ty in tg["tournaments"]:
+                lines.extend(tournament_year_to_lines(ty))
+        return lines
+
+def make_file(rng: random.Random, path: Path, tournaments: int):
+    lines: list[str] = []
+    for g in range(max(tournaments // 20, 1)):
+        lines.append(f"Tournament {g}")
+        for y in range(20):
+            lines.append(f"\t{2000 + y} https://example.com/{g}/{y}/")
+            for r in range(rng.randint(4, 8)):
+                lines.append(f"\t\tRound {r + 1}")
+                for m in range(rng.randint(1, 3)):
+                    lines.append(f"\t\t\tThis house would do thing number {g}-{y}-{r}-{m}")
+                    for i in range(rng.randint(0, 4)):
+                        lines.append(f"\t\t\t\tInfo slide line {i} with some context about the motion")
+                    lines.append(f"\t\t\t\t$stats 1, 2, 3, 4")
+        lines.append("")
+    path.write_text("\n".join(lines))
+
+# Lines right after a header that attach to the previous tournament, as hand-edited files can have. Texts are
+# already normalized, so the tournament they attach to reads the same once it is written again
+MALFORMED = [
+    "Tournament 0", "\t2000 https://example.com/0/0/", "\t\tR1", "\t\t\tTHW do a thing",
+    "Tournament 1", "\t\t\tTHW do an orphan thing", "\t\t\t\tOrphan info slide",
+    "\t2001 https://example.com/1/1/", "\t\t\t\tBalance $stats 1, 2", "\t\tR1", "\t\t\tTHW do another thing", "",
+]
+
+def check_round_trip(path: Path):
+    # Writing back an unchanged file keeps every line once, wherever malformed lines attach
+    path.write_text("\n".join(MALFORMED))
+    reader = MotionFileReader(path)
+    tournament_groups = reader.get_tournament_groups()
+    reader.write_to_file(reader.tournament_groups_to_lines(tournament_groups))
+    assert MotionFileReader(path).get_tournament_groups() == tournament_groups, "Round trip of a malformed file differs"
+
+def bench(name: str, reader: MotionFileReader) -> tuple[float, float]:
+    start = time.perf_counter()
+    reader.get_tournament_groups()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    for _ in reader.iter_tournament_groups():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<24} {elapsed * 1000:>10.1f} ms {peak / 1024 / 1024:>8.1f} MB peak (iterating)")
+    return elapsed, peak
+
+def bench_insert(name: str, reader: MotionFileReader) -> float:
+    tournament_groups = reader.get_tournament_groups()
+    new = json.loads(json.dumps(tournament_groups[0]["tournaments"][0]))
+    new["name"] = "2099 https://example.com/new/"
+    tournament_groups[0]["tournaments"].insert(0, new)
+    start = time.perf_counter()
+    reader.write_to_file(reader.tournament_groups_to_lines(tournament_groups))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed * 1000:>10.1f} ms to write after one insert")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Motions file reader speed and memory against the previous line splitting reader")
+    parser.add_argument("--tournaments", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        check_round_trip(Path(tmp)/"malformed.txt")
+        path = Path(tmp)/"motions.txt"
+        make_file(rng, path, args.tournaments)
+        print(f"{path.stat().st_size / 1024 / 1024:.1f} MB, {args.tournaments} tournaments")
+        legacy, new = LegacyMotionFileReader(path), MotionFileReader(path)
+        assert json.dumps(legacy.get_tournament_groups()) == json.dumps(new.get_tournament_groups()), "Output differs"
+        legacy_time, legacy_peak = bench("legacy", legacy)
+        new_time, new_peak = bench("mmap + iterative", new)
+        print(f"{legacy_time / new_time:.1f}x faster, {legacy_peak / new_peak:.1f}x less memory while iterating")
+        legacy_write = bench_insert("legacy", legacy)
+        new_write = bench_insert("verbatim spans", new)
+        print(f"{legacy_write / new_write:.1f}x faster writes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from app.repository import MotionsRepository
+from app.types import TournamentData, TournamentYear
+from bench_reader import make_file
+
+def make_repository(rng: random.Random, path: Path, files: int, tournaments: int):
+    (path/"Javascript").mkdir(parents=True)
+    tournament_list: list[TournamentData] = []
+    for i in range(files):
+        make_file(rng, path/f"{i}.txt", tournaments)
+        tournament_list.append({"id": str(i), "name": f"Tournament {i}", "short": "", "latest": 2019, "tag": ["BP"], "url": f"{i}.txt"})
+    (path/"Javascript"/"TournamentList.json").write_text(json.dumps(tournament_list, indent=4))
+
+def make_tournament(i: int) -> TournamentYear:
+    return {"name": f"2024 https://example.com/new/{i}/", "rounds": [{
+        "url": "", "seq": 1, "name": "Round 1", "pretty_name": "Round 1",
+        "motions": [{"seq": 1, "stats": [], "motion": {"url": "", "text": f"This house would import tournament {i}", "reference": "", "info_slide": "", "info_slide_plain": ""}}],
+    }]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Importing many tournaments one transaction at a time against a single transaction")
+    parser.add_argument("--imports", type=int, default=20)
+    parser.add_argument("--files", type=int, default=2)
+    parser.add_argument("--tournaments", type=int, default=500, help="Tournaments in each motions file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp)/"source"
+        make_repository(rng, source, args.files, args.tournaments)
+        outputs: list[str] = []
+        timings: list[float] = []
+        for label in ("one transaction per import", "one transaction"):
+            path = Path(tmp)/label.replace(" ", "_")
+            shutil.copytree(source, path)
+            repository = MotionsRepository(path)
+            start = time.perf_counter()
+            if label == "one transaction":
+                with repository.transaction() as transaction:
+                    for i in range(args.imports):
+                        transaction.update_latest(str(i % args.files), 2024)
+                        transaction.insert(f"{i % args.files}.txt", (0, 0), make_tournament(i))
+            else:
+                for i in range(args.imports):
+                    with repository.transaction() as transaction:
+                        transaction.update_latest(str(i % args.files), 2024)
+                        transaction.insert(f"{i % args.files}.txt", (0, 0), make_tournament(i))
+            timings.append(time.perf_counter() - start)
+            print(f"{label:<28} {timings[-1] * 1000:>10.1f} ms for {args.imports} imports")
+            outputs.append("".join(p.read_text() for p in sorted(path.rglob("*.*"))))
+        assert outputs[0] == outputs[1], "Output differs"
+        print(f"{timings[0] / timings[1]:.1f}x faster")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+from app.search import SearchIndex
+from bench_repository import make_repository
+
+QUERIES = ["thing number 12-3", "context", "2-3-1", "Round 4 motion", "nonexistent"]
+
+def main():
+    parser = argparse.ArgumentParser(description="Search index build, incremental update and query latency")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--tournaments", type=int, default=40, help="Tournaments in each motions file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp)/"repository"
+        make_repository(rng, path, args.files, args.tournaments)
+        with SearchIndex(path, Path(tmp)/"index.sqlite3") as index:
+            start = time.perf_counter()
+            stats = index.update()
+            print(f"{'full build':<24} {(time.perf_counter() - start) * 1000:>10.1f} ms ({stats['indexed']} files)")
+            start = time.perf_counter()
+            stats = index.update()
+            print(f"{'no changes':<24} {(time.perf_counter() - start) * 1000:>10.1f} ms ({stats['unchanged']} files unchanged)")
+            with open(path/"0.txt", "a") as f:
+                f.write("\n\t2099 https://example.com/new/\n\t\tRound 1\n\t\t\tThis house would index one more motion")
+            start = time.perf_counter()
+            stats = index.update()
+            print(f"{'one file changed':<24} {(time.perf_counter() - start) * 1000:>10.1f} ms ({stats['indexed']} files indexed)")
+            for query in QUERIES:
+                start = time.perf_counter()
+                results = index.search(query)
+                print(f"{query!r:<24} {(time.perf_counter() - start) * 1000:>10.1f} ms ({len(results)} results)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import argparse
+import random
+import time
+from app.similarity import MotionSimilarity
+from app.search import SearchResult
+from app.reuse import shingles
+
+PREFIXES = ["This house would ", "This house believes that ", "This house regrets ", "本院は"]
+
+def make_corpus(rng: random.Random, size: int) -> list[SearchResult]:
+    vocab = ["".join(rng.choice("abcdefghiklmnoprstuvwy") for _ in range(rng.randint(3, 9))) for _ in range(5000)]
+    texts: list[str] = []
+    while len(texts) < size:
+        words = [rng.choice(vocab) for _ in range(rng.randint(6, 16))]
+        texts.append(rng.choice(PREFIXES) + " ".join(words))
+        # Reused motions, verbatim or lightly edited
+        if rng.random() < 0.05:
+            texts.append(texts[-1])
+        if rng.random() < 0.1:
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+            texts.append(rng.choice(PREFIXES) + " ".join(words))
+    return [SearchResult(file="", tournament_id=str(i), group="", tournament="", round="", motion=text, info="", stats="", rank=0.0) for i, text in enumerate(texts)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate motion detection speed, and recall against comparing every pair")
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--check", type=int, default=1500, help="Number of motions compared pairwise for recall")
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    motions = make_corpus(rng, args.size)
+    start = time.perf_counter()
+    similarity = MotionSimilarity(motions, threshold=args.threshold)
+    built = time.perf_counter()
+    clusters = similarity.clusters()
+    print(f"{len(motions)} motions: signatures {(built - start) * 1000:.0f} ms, clusters {(time.perf_counter() - built) * 1000:.0f} ms, {len(clusters)} clusters ({similarity.bands} bands x {similarity.rows} rows)")
+    start = time.perf_counter()
+    for motion in motions[:100]:
+        similarity.query(motion["motion"])
+    print(f"query {(time.perf_counter() - start) * 10:.2f} ms")
+    # Recall on a subset, against exact Jaccard similarity of every pair
+    subset = motions[:args.check]
+    cluster_of = {id(motion): i for i, cluster in enumerate(MotionSimilarity(subset, threshold=args.threshold).clusters()) for motion in cluster["motions"]}
+    sets = [shingles(motion["motion"]) for motion in subset]
+    pairs = [(i, j) for i in range(len(sets)) for j in range(i + 1, len(sets)) if len(sets[i] & sets[j]) / len(sets[i] | sets[j]) >= args.threshold]
+    found = sum(1 for i, j in pairs if cluster_of.get(id(subset[i]), -1) == cluster_of.get(id(subset[j]), -2))
+    print(f"recall {found}/{len(pairs)} pairs at Jaccard >= {args.threshold}")
+
+if __name__ == "__main__":
+    main()
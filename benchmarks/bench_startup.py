@@ -0,0 +1,71 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parent.parent/"src"
+# Modules only some commands need; importing the CLI must not load them
+FORBIDDEN = {
+    "app.cli": ["pandas", "bs4", "InquirerPy", "prompt_toolkit", "pyperclip"],
+    "app.tui": ["pandas", "numpy", "bs4"],
+}
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    # Self and cumulative microseconds of every module imported, from -X importtime
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, env=_env(), check=True)
+    times: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return times
+
+def wall_time(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *command], capture_output=True, env=_env(), check=True)
+    return time.perf_counter() - start
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_PATH), env.get("PYTHONPATH")]))
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the entry points, and modules they must not load")
+    parser.add_argument("--repeat", type=int, default=7, help="Runs of each measurement; the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    parser.add_argument("--budget", type=float, default=None, help="Fail if the median import of app.cli takes longer, in milliseconds")
+    args = parser.parse_args()
+    failed = False
+    cli_import = 0.0
+    for module, forbidden in FORBIDDEN.items():
+        runs = [import_times(module) for _ in range(args.repeat)]
+        total = statistics.median(times[module][1] for times in runs) / 1000
+        if module == "app.cli":
+            cli_import = total
+        print(f"import {module}: {total:.1f} ms, {len(runs[0])} modules")
+        # Cumulative time of packages imported by the entry point itself, not by app
+        cumulative: dict[str, float] = {}
+        for name in runs[0]:
+            if "." not in name and name != "app":
+                cumulative[name] = statistics.median(times.get(name, (0, 0))[1] for times in runs) / 1000
+        for name, duration in sorted(cumulative.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {name:<24} {duration:>8.1f} ms")
+        loaded = [name for name in forbidden if name in runs[0]]
+        if loaded:
+            failed = True
+            print(f"  ✗ {module} imports {', '.join(loaded)}")
+    help_time = statistics.median(wall_time(["-m", "app.cli", "--help"]) for _ in range(args.repeat)) * 1000
+    print(f"automotions --help: {help_time:.1f} ms")
+    if args.budget is not None and cli_import > args.budget:
+        failed = True
+        print(f"✗ import app.cli took {cli_import:.1f} ms, over the budget of {args.budget:.1f} ms")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
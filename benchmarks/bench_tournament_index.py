@@ -0,0 +1,55 @@
+import argparse
+import random
+import string
+import time
+from app.tournament_index import TournamentIndex
+from app.types import TournamentData
+
+def make_tournaments(rng: random.Random, count: int) -> list[TournamentData]:
+    words = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))).title() for _ in range(count)]
+    tournaments: list[TournamentData] = []
+    for i in range(count):
+        name = " ".join(rng.sample(words, rng.randint(2, 4)))
+        short = "".join(word[0] for word in name.split(" ")).upper() if rng.random() < 0.5 else ""
+        tournaments.append(TournamentData(id=f"t{i}", name=name, short=short, latest=0, tag=[], url=f"Motions/t{i}.txt"))
+    return tournaments
+
+def tabbycat_name(rng: random.Random, tournament: TournamentData) -> str:
+    # Tabbycat names usually carry an edition and year, and sometimes drop or add a word
+    words = tournament["name"].split(" ")
+    if len(words) > 2 and rng.random() < 0.3:
+        words.pop(rng.randrange(len(words)))
+    if rng.random() < 0.3:
+        words.append("Open")
+    return f"{rng.randint(1, 30)}th {' '.join(words)} {rng.randint(2000, 2030)}"
+
+def heuristic_rank(tournaments: list[TournamentData], query: str, target: TournamentData) -> int|None:
+    # Previous behaviour: alphabetic words used as the fuzzy prompt's default query, which filters by substring
+    words = [part.casefold() for part in query.split(" ") if part.isalpha()]
+    matches = [t for t in tournaments if all(word in f"{t['name']} {t['short']}".casefold() for word in words)]
+    return next((i for i, t in enumerate(matches) if t is target), None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Tournament selection index build and query time against the previous default query heuristic")
+    parser.add_argument("--tournaments", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    tournaments = make_tournaments(rng, args.tournaments)
+    start = time.perf_counter()
+    index = TournamentIndex(tournaments)
+    print(f"{args.tournaments} tournaments indexed in {(time.perf_counter() - start) * 1000:.1f} ms")
+    targets = rng.sample(tournaments, args.queries)
+    queries = [tabbycat_name(rng, target) for target in targets]
+    start = time.perf_counter()
+    orders = [index.order(query) for query in queries]
+    elapsed = time.perf_counter() - start
+    print(f"{elapsed / len(queries) * 1000:.2f} ms per query")
+    top = sum(order[0] is target for order, target in zip(orders, targets))
+    legacy = [heuristic_rank(tournaments, query, target) for query, target in zip(queries, targets)]
+    print(f"{'trigram index':<16} {top / len(queries):>6.1%} preselected correctly")
+    print(f"{'default query':<16} {sum(rank == 0 for rank in legacy) / len(queries):>6.1%} first match correct, {sum(rank is None for rank in legacy) / len(queries):.1%} filtered out")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+from typing import TypedDict, Literal, NotRequired
+from pathlib import Path
+import io
+import json
+import random
+from urllib.parse import urlparse
+import requests
+from app.motions import MotionManager
+from app.interface.types import TabbycatContext
+
+FIXTURES_PATH = Path(__file__).parent/"fixtures"
+FIXTURES = ["na", "asian", "bp"]
+BASE_URL = "https://example.calicotab.com/"
+
+class TabbycatPayloads(TypedDict):
+    slug: str
+    name: str
+    type: Literal["NA", "Asian", "BP"]
+    rounds: list[dict]
+    motions: list[dict]
+    statistics: str
+    # Responses of /rounds/<seq>/pairings by round seq, and of /rounds/<seq>/pairings/<id>/ballots by "<seq>/<id>"
+    pairings: NotRequired[dict[int, list[dict]]]
+    ballots: NotRequired[dict[str, list[dict]]]
+
+def load_fixture(name: str) -> TabbycatPayloads:
+    # Responses of /api/v1/tournaments/<slug>/rounds, /motions and /<slug>/motions/statistics/
+    path = FIXTURES_PATH/name
+    tournament = json.loads((path/"tournament.json").read_text(encoding="utf-8"))
+    return TabbycatPayloads(
+        slug=tournament["slug"],
+        name=tournament["name"],
+        type=tournament["type"],
+        rounds=json.loads((path/"rounds.json").read_text(encoding="utf-8")),
+        motions=json.loads((path/"motions.json").read_text(encoding="utf-8")),
+        statistics=(path/"statistics.html").read_text(encoding="utf-8"),
+    )
+
+def route(tournaments: dict[str, TabbycatPayloads], path: str) -> tuple[bytes, str]|None:
+    # Response body and content type for a request path, as Tabbycat would serve it
+    path = "/" + urlparse(path).path.strip("/")
+    if path == "/api/v1/tournaments":
+        return json.dumps([{"slug": payloads["slug"], "name": payloads["name"]} for payloads in tournaments.values()]).encode(), "application/json"
+    parts = path.split("/")
+    slug = parts[4] if path.startswith("/api/v1/tournaments/") else parts[1]
+    payloads = tournaments.get(slug)
+    if payloads is None:
+        return None
+    api = f"/api/v1/tournaments/{slug}"
+    if path == api:
+        return json.dumps({"slug": payloads["slug"], "name": payloads["name"]}).encode(), "application/json"
+    if path == f"{api}/rounds":
+        return json.dumps(payloads["rounds"]).encode(), "application/json"
+    if path == f"{api}/motions":
+        return json.dumps(payloads["motions"]).encode(), "application/json"
+    if path == f"/{payloads['slug']}/motions/statistics":
+        return payloads["statistics"].encode(), "text/html; charset=utf-8"
+    if path.startswith(f"{api}/rounds/") and len(parts) == 8 and parts[7] == "pairings" and parts[6].isdigit() and int(parts[6]) in payloads.get("pairings", {}):
+        return json.dumps(payloads.get("pairings", {})[int(parts[6])]).encode(), "application/json"
+    if path.startswith(f"{api}/rounds/") and len(parts) == 10 and parts[7] == "pairings" and parts[9] == "ballots" and f"{parts[6]}/{parts[8]}" in payloads.get("ballots", {}):
+        return json.dumps(payloads.get("ballots", {})[f"{parts[6]}/{parts[8]}"]).encode(), "application/json"
+    return None
+
+class OfflineMotionManager(MotionManager):
+    # Serves payloads from memory instead of the network
+    def __init__(self, payloads: TabbycatPayloads, *, infer_type: bool = True, stream: bool = False):
+        super().__init__(TabbycatContext(base_url=BASE_URL, tournament_slug=payloads["slug"], tournament_name=payloads["name"], tournament_type=None if infer_type else payloads["type"]), quiet=True, stream=stream)
+        self.payloads = payloads
+
+    def _get(self, path: str, *, stream: bool = False) -> requests.Response:
+        found = route({self.payloads["slug"]: self.payloads}, path)
+        assert found, f"No payload for {path}"
+        body, content_type = found
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = content_type
+        response.encoding = "utf-8"
+        response.raw = io.BytesIO(body)
+        return response
+
+WORDS = [
+    "states", "should", "ban", "research", "abolish", "monarchy", "influencer", "culture", "public", "advertising", "media", "politicians",
+    "disclose", "therapy", "developing", "countries", "manufacturing", "services", "membership", "parents", "schools", "feminist", "movement",
+    "rivers", "personhood", "universal", "income", "wealth", "tax", "central", "banks", "inequality", "religion", "meat", "narrative",
+]
+STANCES = ["This House would", "This House believes that", "This House regrets", "This House supports", "This House opposes", "This House prefers"]
+
+def synthetic_payloads(rng: random.Random, kind: Literal["NA", "Asian", "BP"], motions: int, motions_per_round: int = 10, *, slug: str|None = None, results: bool = False) -> TabbycatPayloads:
+    # Same shapes as the fixtures, scaled up to any number of motions. With results, every round also has pairings and
+    # ballots, and the statistics page shows the stats computed from them
+    slug = slug or f"synthetic-{kind.lower()}"
+    api = f"{BASE_URL}api/v1/tournaments/{slug}"
+    rounds: list[dict] = []
+    motion_list: list[dict] = []
+    tiles: list[str] = []
+    pairings: dict[int, list[dict]] = {}
+    ballots: dict[str, list[dict]] = {}
+    for seq in range(1, (motions + motions_per_round - 1) // motions_per_round + 1):
+        round_url = f"{api}/rounds/{seq}"
+        rounds.append({"id": seq, "url": round_url, "seq": seq, "name": f"Round {seq}", "abbreviation": f"R{seq}", "stage": "P", "completed": True, "motions": []})
+        round_motions: list[tuple[str, str]] = []
+        for j in range(1, min(motions_per_round, motions - len(motion_list)) + 1):
+            text = f"{rng.choice(STANCES)} {' '.join(rng.choices(WORDS, k=rng.randint(4, 14)))} {seq}-{j}"
+            info = "" if rng.random() < 0.4 else "".join(f"<p>{' '.join(rng.choices(WORDS, k=rng.randint(5, 30)))} &amp; more</p>" for _ in range(rng.randint(1, 3)))
+            if info and rng.random() < 0.3:
+                info += "<ul>" + "".join(f"<li>{rng.choice(WORDS)}</li>" for _ in range(rng.randint(2, 5))) + "</ul>"
+            reference = f"R{seq}-{j}"
+            motion_list.append({"id": len(motion_list) + 1, "url": f"{api}/motions/{len(motion_list) + 1}", "text": text, "reference": reference, "info_slide": info, "rounds": [{"round": round_url, "seq": j}]})
+            rounds[-1]["motions"].append(motion_list[-1]["url"])
+            round_motions.append((text, reference))
+        if results:
+            pairings[seq], round_ballots, values = _round_results(rng, kind, round_url, [motion["url"] for motion in motion_list[-len(round_motions):]])
+            ballots.update((f"{seq}/{debate_id}", debate_ballots) for debate_id, debate_ballots in round_ballots.items())
+        else:
+            values = [[rng.randint(0, 20) for _ in range(STATS_VALUES[kind])] for _ in round_motions]
+        items = [f'<div class="list-group-item"><h4 class="mb-2">{text} <small class="text-muted">({reference})</small></h4>{_stats_row(kind, motion_values)}</div>' for (text, reference), motion_values in zip(round_motions, values) if motion_values is not None]
+        tiles.append(f'<div class="list-group mt-3"><div class="list-group-item"><h3 class="mb-0"><span class="badge badge-secondary">Round {seq}</span></h3></div>{"".join(items)}</div>')
+    statistics = f'<!DOCTYPE html><html><body><div class="container-fluid"><div class="row"><div class="col"><h1>Motion Statistics</h1></div></div><div class="row"><div class="col">{"".join(tiles)}</div></div></div></body></html>'
+    payloads = TabbycatPayloads(slug=slug, name=f"Synthetic {kind} {motions}", type=kind, rounds=rounds, motions=motion_list, statistics=statistics)
+    if results:
+        payloads["pairings"] = pairings
+        payloads["ballots"] = ballots
+    return payloads
+
+# Numbers on a motion's row of the statistics page
+STATS_VALUES = {"NA": 2, "Asian": 4, "BP": 16}
+
+def _stats_row(kind: Literal["NA", "Asian", "BP"], values: list[int]) -> str:
+    match kind:
+        case "NA":
+            return f'<div class="row"><div class="col-md-8"><div><span class="text-aff pr-1 d-md-inline d-block">{values[0]} affirmative wins</span></div><div><span class="text-neg pr-1 d-md-inline d-block">{values[1]} negative wins</span></div></div></div>'
+        case "Asian":
+            return f'<div class="row"><div class="col-md-6"><span class="text-aff">{values[0]} wins</span> <span class="text-neg">{values[1]} wins</span></div><div class="col-md-6"><span class="text-aff">{values[2]} vetoes</span> <span class="text-neg">{values[3]} vetoes</span></div></div>'
+        case "BP":
+            bars = "".join('<div><div class="progress">' + "".join(f'<div class="progress-bar" title="{value} teams"></div>' for value in values[i:i + 4]) + "</div></div>" for i in range(0, 16, 4))
+            return f'<div class="row"><div class="col-12"><div>Average points</div><div>by position</div><div>{bars}</div></div></div>'
+
+def _round_results(rng: random.Random, kind: Literal["NA", "Asian", "BP"], round_url: str, motion_urls: list[str]) -> tuple[list[dict], dict[int, list[dict]], list[list[int]|None]]:
+    # Pairings and ballots of a round, and the statistics page values of each motion; motions nobody debated have none.
+    # Some debates have no confirmed ballot, or a discarded earlier version, and split decisions go to the majority
+    sides = ["og", "oo", "cg", "co"] if kind == "BP" else ["aff", "neg"]
+    api = round_url.rsplit("/rounds/", 1)[0]
+    counts = [[0] * STATS_VALUES[kind] for _ in motion_urls]
+    debated = [False] * len(motion_urls)
+    pairings: list[dict] = []
+    ballots: dict[int, list[dict]] = {}
+    for debate_id in range(1, rng.randint(4, 12) + 1):
+        debate_url = f"{round_url}/pairings/{debate_id}"
+        teams = [{"team": f"{api}/teams/{rng.randint(1, 10000)}", "side": side} for side in sides]
+        pairings.append({"id": debate_id, "url": debate_url, "teams": teams, "_links": {"ballots": f"{debate_url}/ballots"}})
+        choices = list(range(len(motion_urls)))
+        vetos: list[dict] = []
+        if kind == "Asian" and len(motion_urls) > 2:
+            for k in range(2):
+                vetoed = rng.randrange(len(motion_urls))
+                vetos.append({"team": teams[k]["team"], "motion": motion_urls[vetoed], "preference": 3})
+                choices = [i for i in choices if i != vetoed] or choices
+        motion = rng.choice(choices)
+        if kind == "BP":
+            points = rng.sample([3, 2, 1, 0], 4)
+            sheets = [{"teams": [{"team": team["team"], "side": team["side"], "points": point, "score": 70 + point} for team, point in zip(teams, points)]}]
+        else:
+            winner = rng.randrange(2)
+            votes = [winner] if rng.random() < 0.5 else rng.sample([winner, winner, 1 - winner], 3)
+            sheets = [{"teams": [{"team": team["team"], "side": team["side"], "win": vote == k, "points": int(vote == k), "score": 150.0 + (vote == k)} for k, team in enumerate(teams)]} for vote in votes]
+        ballot = {"id": debate_id * 10 + 1, "url": f"{debate_url}/ballots/{debate_id * 10 + 1}", "motion": motion_urls[motion], "result": {"sheets": sheets}, "vetos": vetos, "version": 1, "confirmed": True, "discarded": False}
+        if kind == "NA" and len(motion_urls) == 1 and rng.random() < 0.2:
+            ballot["motion"] = None
+        roll = rng.random()
+        if roll < 0.1:
+            # Not confirmed yet, so it doesn't count
+            ballots[debate_id] = [{**ballot, "confirmed": False}]
+            continue
+        if roll < 0.2:
+            ballots[debate_id] = [{**ballot, "id": ballot["id"] - 1, "version": 0, "motion": motion_urls[rng.randrange(len(motion_urls))], "confirmed": False, "discarded": True}, ballot]
+        else:
+            ballots[debate_id] = [ballot]
+        debated[motion] = True
+        for vetoed, veto in enumerate(vetos):
+            counts[motion_urls.index(veto["motion"])][2 + vetoed] += 1
+        if kind == "BP":
+            for k, point in enumerate(points):
+                counts[motion][k * 4 + 3 - point] += 1
+        else:
+            counts[motion][winner] += 1
+    return pairings, ballots, [motion_counts if debated[i] else None for i, motion_counts in enumerate(counts)]
+
+def synthetic_motions_file(rng: random.Random, path: Path, lines: int):
+    # A motions file of about the given number of lines, in the repository's layout
+    output: list[str] = []
+    group = 0
+    while len(output) < lines:
+        output.append(f"Tournament {group}")
+        for year in range(20):
+            output.append(f"\t{2000 + year} https://example.com/{group}/{year}/")
+            for round in range(rng.randint(4, 8)):
+                output.append(f"\t\tR{round + 1}")
+                for motion in range(rng.randint(1, 3)):
+                    output.append(f"\t\t\t{rng.choice(STANCES)} {' '.join(rng.choices(WORDS, k=rng.randint(4, 14)))}")
+                    output.append(f"\t\t\t\tBalance $stats {rng.randint(0, 20)}, {rng.randint(0, 20)}")
+                    output.extend(f"\t\t\t\t{' '.join(rng.choices(WORDS, k=rng.randint(5, 20)))}" for _ in range(rng.randint(0, 4)))
+        output.append("")
+        group += 1
+    path.write_text("\n".join(output), encoding="utf-8")
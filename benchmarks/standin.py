@@ -0,0 +1,235 @@
+from typing import Optional
+import argparse
+import gzip
+import hashlib
+import random
+import socket
+import threading
+import time
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from payloads import FIXTURES, TabbycatPayloads, load_fixture, route, synthetic_payloads
+
+KINDS = ["NA", "Asian", "BP"]
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for many clients connecting at once
+    request_queue_size = 256
+
+class StandinServer:
+    # Serves the Tabbycat endpoints used by MotionManager and CLIInterface._resolve_url for many tournaments,
+    # with configurable latency and injected failures
+    tournaments: dict[str, TabbycatPayloads]
+    latency: float
+    jitter: float
+    failure_rate: float
+    failure_statuses: list[int]
+    timeout_rate: float
+    hang: float
+    retry_after: Optional[int]
+    stats: Counter[str]
+    def __init__(
+        self,
+        tournaments: dict[str, TabbycatPayloads],
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_statuses: Optional[list[int]] = None,
+        timeout_rate: float = 0.0,
+        hang: float = 60.0,
+        retry_after: Optional[int] = None,
+        seed: int = 0,
+    ):
+        self.tournaments = tournaments
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.failure_statuses = failure_statuses or [429, 500]
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Bodies are encoded once per path, so the server isn't the bottleneck
+        self._bodies: dict[str, tuple[bytes, bytes, str, str]|None] = {}
+        self._httpd = _HTTPServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def tournament_url(self, slug: str) -> str:
+        return f"{self.url}{slug}/"
+
+    def __enter__(self) -> "StandinServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        if self._thread is not None:
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _body(self, path: str) -> tuple[bytes, bytes, str, str]|None:
+        if path not in self._bodies:
+            found = route(self.tournaments, path)
+            if found is None:
+                self._bodies[path] = None
+            else:
+                body, content_type = found
+                self._bodies[path] = (body, gzip.compress(body, compresslevel=6), content_type, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+        return self._bodies[path]
+
+    def _draw(self) -> tuple[float, str|int|None]:
+        # Delay before responding and the injected fault, if any
+        with self._lock:
+            delay = self.latency + (self._rng.expovariate(1 / self.jitter) if self.jitter else 0.0)
+            roll = self._rng.random()
+            if roll < self.timeout_rate:
+                return delay, "timeout"
+            if roll < self.timeout_rate + self.failure_rate:
+                return delay, self._rng.choice(self.failure_statuses)
+            return delay, None
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _make_handler(self) -> type[BaseHTTPRequestHandler]:
+        standin = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                standin._count("requests")
+                delay, fault = standin._draw()
+                if delay:
+                    time.sleep(delay)
+                if fault == "timeout":
+                    # Never answers; the client's read timeout has to fire
+                    standin._count("timeout")
+                    time.sleep(standin.hang)
+                    self.close_connection = True
+                    return
+                if isinstance(fault, int):
+                    standin._count(str(fault))
+                    self.send_response(fault)
+                    if fault in (429, 503) and standin.retry_after is not None:
+                        self.send_header("Retry-After", str(standin.retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                found = standin._body(self.path)
+                if found is None:
+                    standin._count("404")
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body, compressed, content_type, etag = found
+                if self.headers.get("If-None-Match") == etag:
+                    standin._count("304")
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                standin._count("200")
+                use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+                data = compressed if use_gzip else body
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("ETag", etag)
+                if use_gzip:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError, socket.timeout):
+                    self.close_connection = True
+        return Handler
+
+def make_tournaments(fixtures: list[str], synthetic: int, motions: int, seed: int, *, results: bool = False) -> dict[str, TabbycatPayloads]:
+    rng = random.Random(seed)
+    tournaments: dict[str, TabbycatPayloads] = {}
+    for name in fixtures:
+        payloads = load_fixture(name)
+        tournaments[payloads["slug"]] = payloads
+    for i in range(synthetic):
+        kind = KINDS[i % len(KINDS)]
+        payloads = synthetic_payloads(rng, kind, motions, slug=f"synthetic-{kind.lower()}-{i}", results=results) # type: ignore
+        tournaments[payloads["slug"]] = payloads
+    return tournaments
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--fixtures", type=str, nargs="*", choices=FIXTURES, default=FIXTURES, help="Recorded tournaments to serve")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generated tournaments to serve, cycling through NA, Asian and BP")
+    parser.add_argument("--motions", type=int, default=60, help="Motions in each generated tournament")
+    parser.add_argument("--results", action="store_true", help="Also serve pairings and ballots of the generated tournaments, for --stats api")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fixed delay before each response, in milliseconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Mean of an exponentially distributed extra delay, in milliseconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with an error status")
+    parser.add_argument("--failure-status", type=int, nargs="+", default=[429, 500], help="Error statuses to inject")
+    parser.add_argument("--retry-after", type=int, default=None, help="Retry-After seconds sent with injected 429 and 503 responses")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that are never answered")
+    parser.add_argument("--hang", type=float, default=60.0, help="Seconds an unanswered request is held open")
+    parser.add_argument("--seed", type=int, default=0)
+
+def server_from_arguments(args: argparse.Namespace, *, host: str = "127.0.0.1", port: int = 0) -> StandinServer:
+    return StandinServer(
+        make_tournaments(args.fixtures, args.synthetic, args.motions, args.seed, results=args.results),
+        host=host,
+        port=port,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        failure_rate=args.failure_rate,
+        failure_statuses=args.failure_status,
+        timeout_rate=args.timeout_rate,
+        hang=args.hang,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Tabbycat stand-in serving recorded and generated tournaments")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+    server = server_from_arguments(args, host=args.host, port=args.port)
+    print(f"Serving {len(server.tournaments)} tournaments on {server.url}")
+    for slug in list(server.tournaments)[:5]:
+        print(f"  {server.tournament_url(slug)}")
+    if len(server.tournaments) > 5:
+        print(f"  ... and {len(server.tournaments) - 5} more")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(", ".join(f"{key}: {count}" for key, count in sorted(server.stats.items())))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+from typing import TypedDict, Callable, Any
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from app.info_slide import InfoSlideConverter, convert_soup, get_converter
+from app.motions import MotionManager
+from app.parser import make_soup
+from app.reader import MotionFileReader
+from app.utils import parse_motion, parse_info, parse_round
+from payloads import FIXTURES, TabbycatPayloads, OfflineMotionManager, load_fixture, synthetic_payloads, synthetic_motions_file
+
+BASELINE_PATH = Path(__file__).parent/"baseline.json"
+
+class Measurement(TypedDict):
+    seconds: float
+    peak_mb: float
+
+class Baseline(TypedDict):
+    python: str
+    machine: str
+    cases: dict[str, Measurement]
+
+# A case's setup runs outside the measurement and returns the function that is measured
+Case = Callable[[], Callable[[], Any]]
+
+def fetch_api(payloads: TabbycatPayloads) -> Case:
+    def setup():
+        # Slides converted by an earlier run would otherwise come from the cache
+        get_converter().clear()
+        return OfflineMotionManager(payloads)._fetch_api
+    return setup
+
+def scrape_statistics(payloads: TabbycatPayloads) -> Case:
+    def setup():
+        manager = OfflineMotionManager(payloads)
+        manager._fetch_api()
+        return lambda: manager._scrape_motion_statistics(make_soup(payloads["statistics"]))
+    return setup
+
+def fetch_results(payloads: TabbycatPayloads) -> Case:
+    # Pairings and ballots of every round, parsed and aggregated into stats
+    def setup():
+        manager = OfflineMotionManager(payloads, infer_type=False)
+        manager._fetch_api()
+        return lambda: manager._fetch_results(manager.rounds)
+    return setup
+
+def prettify_info(slides: list[str], *, cached: bool = False) -> Case:
+    # A fresh converter unless cached, so every slide is converted
+    def setup():
+        converter = InfoSlideConverter()
+        if cached:
+            converter.convert_many(slides)
+        return lambda: converter.convert_many(slides)
+    return setup
+
+def prettify_info_soup(slides: list[str]) -> Case:
+    def setup():
+        return lambda: [convert_soup(slide) for slide in slides]
+    return setup
+
+def normalize(fn: Callable[[str], str], texts: list[str]) -> Case:
+    # The unmemoized function, so every call does the work
+    def setup():
+        return lambda: [fn.__wrapped__(text) for text in texts] # type: ignore
+    return setup
+
+def read_file(path: Path) -> Case:
+    def setup():
+        return MotionFileReader(path).get_tournament_groups
+    return setup
+
+def round_trip(path: Path) -> Case:
+    def setup():
+        reader = MotionFileReader(path)
+        def run():
+            reader.write_to_file(reader.tournament_groups_to_lines(reader.get_tournament_groups()))
+        return run
+    return setup
+
+def insert_write(path: Path) -> Case:
+    def setup():
+        reader = MotionFileReader(path)
+        tournament_groups = reader.get_tournament_groups()
+        new = json.loads(json.dumps(tournament_groups[0]["tournaments"][0]))
+        new["name"] = "2099 https://example.com/new/"
+        tournament_groups[0]["tournaments"].insert(0, new)
+        return lambda: reader.write_to_file(reader.tournament_groups_to_lines(tournament_groups))
+    return setup
+
+def make_cases(tmp: Path, args: argparse.Namespace) -> dict[str, Case]:
+    rng = random.Random(args.seed)
+    fixtures = {name: load_fixture(name) for name in FIXTURES}
+    synthetic = synthetic_payloads(rng, "BP", args.motions)
+    cases: dict[str, Case] = {}
+    for name, payloads in [*fixtures.items(), (f"synthetic-{args.motions}", synthetic)]:
+        cases[f"fetch_api/{name}"] = fetch_api(payloads)
+        cases[f"scrape_statistics/{name}"] = scrape_statistics(payloads)
+    # A separate generator, so the other synthetic inputs stay the same
+    results = synthetic_payloads(random.Random(args.seed + 1), "Asian", args.motions // 10, 3, results=True)
+    cases[f"scrape_statistics/results-{args.motions // 10}"] = scrape_statistics(results)
+    cases[f"fetch_results/results-{args.motions // 10}"] = fetch_results(results)
+    slides = [motion["info_slide"] for motion in synthetic["motions"] if motion["info_slide"]]
+    slides += [motion["info_slide"] for payloads in fixtures.values() for motion in payloads["motions"] if motion["info_slide"]]
+    cases["prettify_info"] = prettify_info(slides)
+    cases["prettify_info/bs4"] = prettify_info_soup(slides)
+    cases["prettify_info/cached"] = prettify_info(slides, cached=True)
+    texts = [motion["text"] for motion in synthetic["motions"]]
+    cases["normalize/parse_motion"] = normalize(parse_motion, texts)
+    cases["normalize/parse_info"] = normalize(parse_info, [MotionManager._prettify_info(slide) for slide in slides])
+    cases["normalize/parse_round"] = normalize(parse_round, [round["name"] for payloads in fixtures.values() for round in payloads["rounds"]] * 100)
+    path = tmp/"motions.txt"
+    synthetic_motions_file(rng, path, args.lines)
+    cases[f"reader/read-{args.lines}"] = read_file(path)
+    cases[f"reader/round_trip-{args.lines}"] = round_trip(path)
+    cases[f"reader/insert_write-{args.lines}"] = insert_write(path)
+    return cases
+
+def measure(case: Case, repeat: int, budget: float) -> Measurement:
+    # Best of several runs for time, fewer once the budget is spent; peak traced allocations of a separate run for memory
+    best = float("inf")
+    spent = 0.0
+    for _ in range(repeat):
+        fn = case()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        if spent > budget:
+            break
+    fn = case()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Measurement(seconds=best, peak_mb=peak / 1024 / 1024)
+
+def compare(name: str, measurement: Measurement, baseline: Measurement|None, args: argparse.Namespace) -> list[str]:
+    if baseline is None:
+        return []
+    regressions: list[str] = []
+    # Very short cases are noisy, so a regression must also exceed an absolute margin
+    if measurement["seconds"] > baseline["seconds"] * (1 + args.time_tolerance) and measurement["seconds"] - baseline["seconds"] > args.min_delta:
+        regressions.append(f"{name}: {measurement['seconds'] / baseline['seconds']:.2f}x slower ({baseline['seconds'] * 1000:.1f} ms -> {measurement['seconds'] * 1000:.1f} ms)")
+    if measurement["peak_mb"] > baseline["peak_mb"] * (1 + args.memory_tolerance) and measurement["peak_mb"] - baseline["peak_mb"] > 0.1:
+        regressions.append(f"{name}: {measurement['peak_mb'] / baseline['peak_mb']:.2f}x more memory ({baseline['peak_mb']:.1f} MB -> {measurement['peak_mb']:.1f} MB)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot path benchmarks on recorded Tabbycat fixtures and synthetic large inputs, checked against a stored baseline")
+    parser.add_argument("--filter", "-k", type=str, default=None, help="Only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=2.0, help="Seconds after which a case isn't repeated again")
+    parser.add_argument("--motions", type=int, default=10000, help="Motions in the synthetic tournament")
+    parser.add_argument("--lines", type=int, default=100000, help="Lines in the synthetic motions file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="Allowed slowdown before a case is flagged")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed memory growth before a case is flagged")
+    parser.add_argument("--min-delta", type=float, default=0.002, help="Slowdowns smaller than this many seconds are never flagged")
+    args = parser.parse_args()
+    baseline: Baseline|None = json.loads(args.baseline.read_text()) if args.baseline.exists() else None
+    if baseline is not None and baseline["machine"] != platform.machine():
+        print(f"Baseline was recorded on {baseline['machine']}, timings may not be comparable", file=sys.stderr)
+    results: dict[str, Measurement] = {}
+    regressions: list[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = make_cases(Path(tmp), args)
+        print(f"{'case':<36} {'time':>12} {'peak':>10} {'baseline':>12}")
+        for name, case in cases.items():
+            if args.filter and args.filter not in name:
+                continue
+            measurement = results[name] = measure(case, args.repeat, args.budget)
+            previous = baseline["cases"].get(name) if baseline else None
+            regressions += (found := compare(name, measurement, previous, args))
+            reference = f"{previous['seconds'] * 1000:>9.2f} ms" if previous else f"{'-':>12}"
+            print(f"{name:<36} {measurement['seconds'] * 1000:>9.2f} ms {measurement['peak_mb']:>7.2f} MB {reference}{' !' if found else ''}")
+    if args.update_baseline:
+        cases_baseline = dict(baseline["cases"]) if baseline and args.filter else {}
+        cases_baseline.update(results)
+        args.baseline.write_text(json.dumps(Baseline(python=platform.python_version(), machine=platform.machine(), cases=cases_baseline), indent=4) + "\n")
+        print(f"Baseline written to {args.baseline}")
+    elif regressions:
+        print("\nRegressions:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,16 @@
-from .app import AutoMotionsApp
-from .interface import TUIInterface
+from typing import TYPE_CHECKING
+from importlib import import_module
 
-__all__ = ["AutoMotionsApp", "TUIInterface"]
\ No newline at end of file
+if TYPE_CHECKING:
+    from .app import AutoMotionsApp
+    from .interface.tui import TUIInterface
+
+__all__ = ["AutoMotionsApp", "TUIInterface"]
+
+# Loaded on first use, so importing any submodule doesn't pull in the TUI and the whole app
+_LAZY = {"AutoMotionsApp": ".app", "TUIInterface": ".interface.tui"}
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,126 @@
+from typing import TypedDict, Literal, Optional, Iterable
+from collections import Counter
+from .types import Round, MotionStats
+
+StatsEngine = Literal["auto", "html", "api"]
+StatsEngineList = ["auto", "html", "api"]
+TWO_TEAM_SIDES = ["aff", "neg"]
+BP_SIDES = ["og", "oo", "cg", "co"]
+BP_POSITIONS = ["OG", "OO", "CG", "CO"]
+# Debate team motion preference that Tabbycat records for a veto
+VETO_PREFERENCE = 3
+# Pairings and ballots requested at once, within the session's connection pool
+RESULTS_WORKERS = 8
+
+_engine: StatsEngine = "auto"
+
+def configure(engine: StatsEngine):
+    if engine not in StatsEngineList:
+        raise ValueError(f"Invalid statistics engine: {engine}")
+    global _engine
+    _engine = engine
+
+def get_engine() -> StatsEngine:
+    return _engine
+
+class DebateResult(TypedDict):
+    # URL of the motion debated, if the ballot names one
+    motion: Optional[str]
+    teams: int
+    # Side that won a two-team debate on the majority of sheets
+    winner: Optional[str]
+    # Points of each side of a BP debate
+    points: Optional[dict[str, int]]
+    # (motion URL, side) of each veto
+    vetoes: list[tuple[str, str]]
+
+def pairings_path(slug: str, round: Round) -> str:
+    return f"/api/v1/tournaments/{slug}/rounds/{round['seq']}/pairings"
+
+def ballots_path(slug: str, round: Round, debate: dict) -> str:
+    return f"{pairings_path(slug, round)}/{debate['id']}/ballots"
+
+def parse_debate(debate: dict, ballots: list[dict]) -> DebateResult:
+    # A debate from /rounds/<seq>/pairings and its ballot submissions; only the confirmed, undiscarded one counts
+    sides = {team["team"]: team["side"] for team in debate.get("teams", []) if team.get("team") and team.get("side")}
+    confirmed = [ballot for ballot in ballots if ballot.get("confirmed") and not ballot.get("discarded")]
+    result = DebateResult(motion=None, teams=len(debate.get("teams", [])), winner=None, points=None, vetoes=[])
+    if not confirmed:
+        return result
+    ballot = max(confirmed, key=lambda x: x.get("version") or 0)
+    result["motion"] = ballot.get("motion")
+    for veto in ballot.get("vetos") or []:
+        side = sides.get(veto.get("team"))
+        if side is not None and veto.get("motion") and veto.get("preference", VETO_PREFERENCE) == VETO_PREFERENCE:
+            result["vetoes"].append((veto["motion"], side))
+    sheets = [{team["side"]: team for team in sheet.get("teams", []) if team.get("side")} for sheet in (ballot.get("result") or {}).get("sheets", [])]
+    if result["teams"] == 4:
+        # Eliminations only record advancing teams, so they have no points
+        result["points"] = next(({side: sheet[side]["points"] for side in BP_SIDES} for sheet in sheets if all(sheet.get(side, {}).get("points") is not None for side in BP_SIDES)), None)
+    else:
+        votes = Counter(winner for winner in map(_sheet_winner, sheets) if winner is not None)
+        ranked = votes.most_common(2)
+        if ranked and (len(ranked) == 1 or ranked[0][1] > ranked[1][1]):
+            result["winner"] = ranked[0][0]
+    return result
+
+def _sheet_winner(sheet: dict[str, dict]) -> Optional[str]:
+    aff, neg = sheet.get("aff"), sheet.get("neg")
+    if aff is None or neg is None:
+        return None
+    if aff.get("win") is not None or neg.get("win") is not None:
+        return "aff" if aff.get("win") else "neg" if neg.get("win") else None
+    # Older ballots only have scores
+    if aff.get("score") is None or neg.get("score") is None or aff["score"] == neg["score"]:
+        return None
+    return "aff" if aff["score"] > neg["score"] else "neg"
+
+def infer_tournament_type(results: list[DebateResult]) -> Optional[Literal["NA", "Asian", "BP"]]:
+    # Four teams make BP. The statistics page has a veto column, which is read as Asian, when vetoes are enabled
+    if not results:
+        return None
+    if any(result["teams"] == 4 for result in results):
+        return "BP"
+    if any(result["vetoes"] for result in results):
+        return "Asian"
+    return "NA"
+
+def round_stats(round: Round, results: Iterable[DebateResult], tournament_type: Literal["NA", "Asian", "BP"]):
+    # Sets the stats of every motion debated in the round, as the statistics page shows them; the Asian room totals
+    # are filled by the caller. Counts are aggregated with numpy, which is only loaded when this engine runs
+    import numpy as np
+    motion_count = len(round["motions"])
+    index = {round_motion["motion"]["url"]: i for i, round_motion in enumerate(round["motions"])}
+    def motion_index(url: Optional[str]) -> int:
+        # Ballots of rounds with a single motion may not name it
+        if url is None:
+            return 0 if motion_count == 1 else -1
+        return index.get(url, -1)
+    results = list(results)
+    decided = [(motion_index(result["motion"]), result) for result in results if (result["points"] if tournament_type == "BP" else result["winner"]) is not None]
+    decided = [(i, result) for i, result in decided if i >= 0]
+    motions = np.array([i for i, _ in decided], dtype=np.intp)
+    # Motions without a decided debate aren't listed on the statistics page
+    debated = np.bincount(motions, minlength=motion_count) > 0
+    match tournament_type:
+        case "NA" | "Asian":
+            winners = np.array([TWO_TEAM_SIDES.index(result["winner"]) for _, result in decided], dtype=np.intp)
+            wins = np.bincount(motions * 2 + winners, minlength=motion_count * 2).reshape(motion_count, 2)
+            vetoes = [(motion_index(motion), TWO_TEAM_SIDES.index(side)) for result in results for motion, side in result["vetoes"] if side in TWO_TEAM_SIDES]
+            veto_array = np.array([i * 2 + side for i, side in vetoes if i >= 0], dtype=np.intp)
+            veto_counts = np.bincount(veto_array, minlength=motion_count * 2).reshape(motion_count, 2)
+            for i in np.flatnonzero(debated):
+                stats = [MotionStats(type_="Balance", value=wins[i].tolist())]
+                if tournament_type == "Asian":
+                    stats.append(MotionStats(type_="Veto", value=veto_counts[i].tolist()))
+                round["motions"][i]["stats"] = stats
+        case "BP":
+            points = np.array([[result["points"][side] for side in BP_SIDES] for _, result in decided], dtype=np.intp).reshape(-1, 4) # type: ignore
+            valid = ((points >= 0) & (points <= 3)).all(axis=1)
+            # Bars run from first place (3 points) to fourth, for each position
+            cells = motions[valid, None] * 16 + np.arange(4) * 4 + (3 - points[valid])
+            counts = np.bincount(cells.ravel(), minlength=motion_count * 16).reshape(motion_count, 4, 4)
+            for i in np.flatnonzero(debated):
+                round["motions"][i]["stats"] = [MotionStats(type_=position, value=counts[i, k].tolist()) for k, position in enumerate(BP_POSITIONS)]
+        case _:
+            raise ValueError("Invalid tournament type")
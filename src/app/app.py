@@ -1,25 +1,52 @@
+from typing import Optional
+from pathlib import Path
+from contextlib import ExitStack
+import csv
+import io
+import os
 import sys
+import time
 import traceback
-import pyperclip
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
 from yaspin import yaspin
-import pandas as pd
-from .interface import BaseInterface, TabbycatContext
+from .interface import BaseInterface, CLIInterface, TabbycatContext
 from .motions import MotionManager
+from .ndjson import NDJSONWriter
+from .refresh import source_context, diff_stats, apply_stats, format_stats
+from .repository import MotionsRepository, RepositoryTransaction
+from .reuse import ReusedMotions, describe_reused_motions
+from .spinner import yaspin as quiet_yaspin
+from .types import TournamentData, TournamentSource, TournamentYear
+from .watch import TournamentWatcher
 from .utils import tournament_year_to_lines, parse_round_table, parse_motion, parse_info
 
 class AutoMotionsApp:
-    def __init__(self, interface: BaseInterface):
+    def __init__(self, interface: BaseInterface, *, stream: bool = False):
         self.interface = interface
+        self.stream = stream
     
     def run(self):
         try:
             ctx = self.interface.get_context()
-            motion_manager = MotionManager(ctx)
-            data_year = motion_manager.get_data()
             output_formats = self.interface.get_output_format()
+            with ExitStack() as stack:
+                ndjson_writer: NDJSONWriter|None = None
+                quiet = False
+                if "ndjson" in output_formats:
+                    # Rounds are written while the rest of the tournament is still being processed
+                    target = self.interface.get_ndjson_output()
+                    quiet = target == "-"
+                    ndjson_stream = sys.stdout if quiet else stack.enter_context(open(target, "w", encoding="utf-8"))
+                    ndjson_writer = NDJSONWriter(ndjson_stream, ctx["tournament_name"] or "")
+                motion_manager = MotionManager(ctx, stream=self.stream, quiet=quiet, on_round=ndjson_writer.write_round if ndjson_writer else None)
+                data_year = motion_manager.get_data()
+                if ndjson_writer is not None:
+                    ndjson_writer.write_tournament(data_year)
             if "clipboard_text" in output_formats:
                 with yaspin(text="Copying to clipboard...", color="blue") as spinner:
                     try:
+                        import pyperclip # Only loaded when the clipboard is used
                         pyperclip.copy("\n".join(tournament_year_to_lines(data_year)))
                         spinner.text = "Copied to clipboard"
                         spinner.color = "green"
@@ -31,9 +58,12 @@ class AutoMotionsApp:
             if "clipboard_table" in output_formats:
                 with yaspin(text="Copying to clipboard...", color="blue") as spinner:
                     try:
+                        import pyperclip
                         dt = [[None, None, None, data_year["name"], parse_round_table(round["pretty_name"]), None, None, parse_motion(motion["motion"]["text"]), parse_info(motion["motion"]["info_slide_plain"]) or None] for round in data_year["rounds"] for motion in round["motions"]]
-                        df = pd.DataFrame(dt)
-                        pyperclip.copy(df.to_csv(index=False, header=False, sep="\t"))
+                        # Same TSV as pandas' DataFrame.to_csv(sep="\t") without loading pandas
+                        table = io.StringIO()
+                        csv.writer(table, delimiter="\t", lineterminator=os.linesep).writerows(dt)
+                        pyperclip.copy(table.getvalue())
                         spinner.text = "Copied to clipboard"
                         spinner.color = "green"
                         spinner.ok("✓")
@@ -44,9 +74,230 @@ class AutoMotionsApp:
                 path_repo = self.interface.get_git_repository(ctx)
                 self.interface.handle_git(ctx, path_repo, data_year)
             
+        except BrokenPipeError:
+            # Whoever read the NDJSON output on stdout has gone, which needs no traceback
+            sys.exit(1)
         except Exception as e:
-            print(e)
-            print(traceback.format_exc())
-            print("Terminating application...")
+            print(e, file=sys.stderr)
+            print(traceback.format_exc(), file=sys.stderr)
+            print("Terminating application...", file=sys.stderr)
+            sys.exit(1)
+
+class AutoMotionsBatchApp:
+    def __init__(self, interfaces: list[CLIInterface], *, workers: int = 8, stream: bool = False):
+        self.interfaces = interfaces
+        self.workers = max(1, workers)
+        self.stream = stream
+
+    def run(self):
+        try:
+            results: list[tuple[TabbycatContext, TournamentYear]|None] = [None] * len(self.interfaces)
+            failed = 0
+            with yaspin(text=f"Fetching {len(self.interfaces)} tournaments", color="blue") as spinner:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(self.interfaces) or 1)) as executor:
+                    futures = {executor.submit(self._fetch, interface, self.stream): i for i, interface in enumerate(self.interfaces)}
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        try:
+                            results[i] = future.result()
+                            spinner.write(f"✓ {results[i][0]['tournament_name']} ({self.interfaces[i].tabbycat_url})") # type: ignore
+                        except Exception as e:
+                            failed += 1
+                            spinner.write(f"✗ {self.interfaces[i].tabbycat_url}: {e}")
+                spinner.text = f"Fetched {len(self.interfaces) - failed} of {len(self.interfaces)} tournaments"
+                if failed:
+                    spinner.color = "red"
+                    spinner.fail("✗")
+                else:
+                    spinner.color = "green"
+                    spinner.ok("✓")
+            # Writes are queued in manifest order so save positions behave as in sequential runs,
+            # then each file is written once
+            with yaspin(text="Writing to repository", color="blue") as spinner, ExitStack() as stack:
+                transactions: dict[Path, RepositoryTransaction] = {}
+                reused: dict[Path, ReusedMotions] = {}
+                for interface, result in zip(self.interfaces, results):
+                    if result is None:
+                        continue
+                    ctx, data_year = result
+                    path_repo = interface.get_git_repository(ctx)
+                    if path_repo not in transactions:
+                        transactions[path_repo] = RepositoryTransaction(MotionsRepository(path_repo))
+                    if interface.check_duplicates:
+                        if path_repo not in reused:
+                            reused[path_repo] = stack.enter_context(ReusedMotions(path_repo))
+                        for warning in describe_reused_motions(reused[path_repo], data_year):
+                            spinner.write(warning)
+                    interface.queue_git(ctx, transactions[path_repo], data_year)
+                    spinner.write(f"✓ Queued {data_year['name']} to {interface.id}")
+                for transaction in transactions.values():
+                    transaction.commit()
+                spinner.text = "Written to repository"
+                spinner.color = "green"
+                spinner.ok("✓")
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print(traceback.format_exc(), file=sys.stderr)
+            print("Terminating application...", file=sys.stderr)
+            sys.exit(1)
+        if failed:
+            print(f"{failed} tournaments failed to fetch", file=sys.stderr)
+            sys.exit(1)
+
+    @staticmethod
+    def _fetch(interface: CLIInterface, stream: bool) -> tuple[TabbycatContext, TournamentYear]:
+        ctx = interface.get_context()
+        return ctx, MotionManager(ctx, quiet=True, stream=stream).get_data()
+
+class AutoMotionsWatchApp:
+    def __init__(self, interface: CLIInterface, *, interval: float = 60.0, polls: Optional[int] = None):
+        self.interface = interface
+        self.interval = interval
+        self.polls = polls
+
+    def run(self):
+        try:
+            ctx = self.interface.get_context()
+            path_repo = self.interface.get_git_repository(ctx)
+            watcher = TournamentWatcher(ctx)
+            checked: set[str] = set()
+            with ExitStack() as stack:
+                reused: Optional[ReusedMotions] = None
+                if self.interface.check_duplicates:
+                    # An earlier watch of the same tournament may already be in the repository
+                    reused = stack.enter_context(ReusedMotions(path_repo, exclude_tournament=ctx["tournament_name"]))
+                ndjson_writer: NDJSONWriter|None = None
+                quiet = False
+                if "ndjson" in self.interface.get_output_format():
+                    # A round is written again each time it changes; the last line of a round supersedes earlier ones
+                    target = self.interface.get_ndjson_output()
+                    quiet = target == "-"
+                    ndjson_stream = sys.stdout if quiet else stack.enter_context(open(target, "w", encoding="utf-8"))
+                    ndjson_writer = NDJSONWriter(ndjson_stream, ctx["tournament_name"] or "")
+                with quiet_yaspin(text=f"Watching {ctx['tournament_name']}", color="blue", quiet=quiet) as spinner:
+                    log = (lambda text: print(text, file=sys.stderr)) if quiet else spinner.write
+                    polls = 0
+                    try:
+                        while True:
+                            try:
+                                changed = watcher.poll()
+                            except requests.RequestException as e:
+                                # The next poll retries; changes read so far are returned by it
+                                log(f"✗ {e}")
+                                changed = []
+                            if watcher.statistics_error is not None:
+                                log(f"✗ Statistics: {watcher.statistics_error}")
+                            if changed:
+                                data_year = watcher.tournament_year()
+                                with MotionsRepository(path_repo).transaction() as transaction:
+                                    if self.interface.sync_git(ctx, transaction, data_year):
+                                        log(f"✓ Inserted {data_year['name']} into {self.interface.id}")
+                                for round in changed:
+                                    with_stats = any(round_motion["stats"] for round_motion in round["motions"])
+                                    log(f"✓ {round['pretty_name']}: {len(round['motions'])} motions{' with statistics' if with_stats else ''}")
+                                    if reused is not None and round["url"] not in checked:
+                                        checked.add(round["url"])
+                                        for warning in describe_reused_motions(reused, {"name": data_year["name"], "rounds": [round]}):
+                                            log(warning)
+                                    if ndjson_writer is not None:
+                                        ndjson_writer.write_round(round)
+                            polls += 1
+                            spinner.text = f"Watching {ctx['tournament_name']}, last polled at {time.strftime('%H:%M:%S')}"
+                            if self.polls is not None and polls >= self.polls:
+                                break
+                            time.sleep(self.interval)
+                    except KeyboardInterrupt:
+                        pass
+                    if ndjson_writer is not None:
+                        ndjson_writer.write_tournament(watcher.tournament_year())
+                    spinner.text = f"Stopped watching {ctx['tournament_name']} after {polls} polls"
+                    spinner.color = "green"
+                    spinner.ok("✓")
+        except BrokenPipeError:
+            # Whoever read the NDJSON output on stdout has gone, which needs no traceback
+            sys.exit(1)
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print(traceback.format_exc(), file=sys.stderr)
+            print("Terminating application...", file=sys.stderr)
+            sys.exit(1)
+
+class AutoMotionsRefreshApp:
+    def __init__(self, repository_path: Path, *, ids: Optional[list[str]] = None, years: Optional[list[int]] = None, workers: int = 8, stream: bool = False, dry_run: bool = False):
+        self.repository_path = repository_path
+        self.ids = ids
+        self.years = years
+        self.workers = max(1, workers)
+        self.stream = stream
+        self.dry_run = dry_run
+
+    def run(self):
+        try:
+            transaction = RepositoryTransaction(MotionsRepository(self.repository_path))
+            targets: list[tuple[TournamentData, TournamentSource]] = [
+                (tournament, source)
+                for tournament in transaction.tournament_list if not self.ids or tournament["id"] in self.ids
+                for source in tournament.get("sources", []) if not self.years or source["year"] in self.years
+            ]
+            if not targets:
+                print("No recorded Tabbycat sources to refresh")
+                return
+            results: list[TournamentYear|None] = [None] * len(targets)
+            failed = 0
+            with yaspin(text=f"Fetching {len(targets)} tournaments", color="blue") as spinner:
+                with ThreadPoolExecutor(max_workers=min(self.workers, len(targets))) as executor:
+                    futures = {executor.submit(MotionManager(source_context(source), quiet=True, stream=self.stream).get_data): i for i, (_, source) in enumerate(targets)}
+                    for future in as_completed(futures):
+                        i = futures[future]
+                        try:
+                            results[i] = future.result()
+                        except Exception as e:
+                            failed += 1
+                            spinner.write(f"✗ {targets[i][1]['name']} ({targets[i][1]['url']}): {e}")
+                spinner.text = f"Fetched {len(targets) - failed} of {len(targets)} tournaments"
+                if failed:
+                    spinner.color = "red"
+                    spinner.fail("✗")
+                else:
+                    spinner.color = "green"
+                    spinner.ok("✓")
+            # Only tournaments whose statistics differ are rewritten; the rest of each file is written back verbatim
+            changed = 0
+            with yaspin(text="Comparing statistics", color="blue") as spinner:
+                for (tournament, source), fetched in zip(targets, results):
+                    if fetched is None:
+                        continue
+                    position = transaction.find_tournament_year(tournament["url"], source["name"])
+                    if position is None:
+                        failed += 1
+                        spinner.write(f"✗ {source['name']} not found in {tournament['url']}")
+                        continue
+                    existing = transaction.get_tournament_groups(tournament["url"])[position[0]]["tournaments"][position[1]]
+                    diff = diff_stats(existing, fetched)
+                    notes = [f"{diff['missing']} motions not in the repository"] if diff["missing"] else []
+                    if diff["without_stats"]:
+                        notes.append(f"{diff['without_stats']} motions fetched without statistics, kept as they are")
+                    missing = f" ({'; '.join(notes)})" if notes else ""
+                    if not diff["changes"]:
+                        spinner.write(f"= {source['name']}: unchanged{missing}")
+                        continue
+                    changed += 1
+                    spinner.write(f"✓ {source['name']}: {len(diff['changes'])} motions with new statistics{missing}")
+                    for change in diff["changes"]:
+                        spinner.write(f"    {change['round']} / {change['motion']}: {format_stats(change['before'])} → {format_stats(change['after'])}")
+                    if not self.dry_run:
+                        apply_stats(diff)
+                        transaction.replace(tournament["url"], position, existing)
+                if not self.dry_run:
+                    transaction.commit()
+                spinner.text = f"{changed} of {len(targets)} tournaments changed" + (" (dry run, nothing written)" if self.dry_run else "")
+                spinner.color = "green"
+                spinner.ok("✓")
+        except Exception as e:
+            print(e, file=sys.stderr)
+            print(traceback.format_exc(), file=sys.stderr)
+            print("Terminating application...", file=sys.stderr)
+            sys.exit(1)
+        if failed:
+            print(f"{failed} tournaments failed to refresh", file=sys.stderr)
             sys.exit(1)
-    
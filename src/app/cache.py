@@ -0,0 +1,174 @@
+from typing import TypedDict, Literal, Optional
+from pathlib import Path
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+CACHE_STATUS_HEADER = "X-Automotions-Cache"
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+CHUNK_SIZE = 64 * 1024
+
+class CacheMissError(requests.exceptions.ConnectionError):
+    pass
+
+class CacheEntry(TypedDict):
+    url: str
+    headers: dict[str, str]
+    stored_at: float
+    size: int
+
+def default_cache_dir() -> Path:
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home()/".cache")/"automotions"
+
+class ResponseCache:
+    path: Path
+    max_age: float
+    max_size: int
+    ttl: float
+    offline: bool
+    def __init__(self, path: Path, *, max_age: float = DEFAULT_MAX_AGE, max_size: int = DEFAULT_MAX_SIZE, ttl: float = 0, offline: bool = False):
+        self.path = path
+        self.max_age = max_age
+        self.max_size = max_size
+        self.ttl = ttl
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        meta_path, body_path = self._paths(url)
+        try:
+            entry: CacheEntry = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if entry["url"] != url or not body_path.exists():
+            return None
+        if time.time() - entry["stored_at"] > self.max_age:
+            self._remove(meta_path, body_path)
+            return None
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.time() - entry["stored_at"] <= self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: CacheEntry) -> dict[str, str]:
+        headers = CaseInsensitiveDict(entry["headers"])
+        conditional: dict[str, str] = {}
+        if "ETag" in headers:
+            conditional["If-None-Match"] = headers["ETag"]
+        if "Last-Modified" in headers:
+            conditional["If-Modified-Since"] = headers["Last-Modified"]
+        return conditional
+
+    def response(self, url: str, entry: CacheEntry, status: Literal["hit", "revalidated", "miss"], *, stream: bool = False) -> requests.Response:
+        meta_path, body_path = self._paths(url)
+        os.utime(meta_path) # Recently used entries survive eviction
+        response = requests.Response()
+        response.url = url
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.headers[CACHE_STATUS_HEADER] = status
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = open(body_path, "rb")
+        if not stream:
+            response.content # Reads the body so the file can be closed right away
+            response.raw.close()
+        return response
+
+    def revalidated(self, url: str, entry: CacheEntry, response: requests.Response, *, stream: bool = False) -> requests.Response:
+        for header in STORED_HEADERS:
+            if header in response.headers:
+                entry["headers"][header] = response.headers[header]
+        entry["stored_at"] = time.time()
+        meta_path, _ = self._paths(url)
+        self._write(meta_path, json.dumps(entry).encode())
+        return self.response(url, entry, "revalidated", stream=stream)
+
+    def store(self, url: str, response: requests.Response, *, stream: bool = False) -> requests.Response:
+        meta_path, body_path = self._paths(url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # The body goes to disk chunk by chunk, so large pages never sit in memory here
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=body_path.parent, delete=False) as f:
+            try:
+                for chunk in response.iter_content(CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        os.replace(f.name, body_path)
+        entry = CacheEntry(
+            url=url,
+            headers={header: response.headers[header] for header in STORED_HEADERS if header in response.headers},
+            stored_at=time.time(),
+            size=size,
+        )
+        self._write(meta_path, json.dumps(entry).encode())
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+        self.prune()
+        return self.response(url, entry, "miss", stream=stream)
+
+    def prune(self):
+        with self._lock:
+            entries: list[tuple[float, int, Path, Path]] = []
+            if self._size is None or self._size > self.max_size:
+                now = time.time()
+                total = 0
+                for meta_path in self.path.glob("*/*.json"):
+                    body_path = meta_path.with_suffix(".body")
+                    try:
+                        entry: CacheEntry = json.loads(meta_path.read_text(encoding="utf-8"))
+                        accessed_at = meta_path.stat().st_mtime
+                    except (OSError, ValueError):
+                        self._remove(meta_path, body_path)
+                        continue
+                    if now - entry["stored_at"] > self.max_age:
+                        self._remove(meta_path, body_path)
+                        continue
+                    entries.append((accessed_at, entry["size"], meta_path, body_path))
+                    total += entry["size"]
+                # Least recently used entries are evicted first
+                entries.sort()
+                while total > self.max_size and entries:
+                    _, size, meta_path, body_path = entries.pop(0)
+                    self._remove(meta_path, body_path)
+                    total -= size
+                self._size = total
+
+    def clear(self):
+        with self._lock:
+            for meta_path in self.path.glob("*/*.json"):
+                self._remove(meta_path, meta_path.with_suffix(".body"))
+            self._size = 0
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        return self.path/key[:2]/f"{key}.json", self.path/key[:2]/f"{key}.body"
+
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
+
+    @staticmethod
+    def _remove(*paths: Path):
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -1,17 +1,40 @@
 import argparse
+import cProfile
+import sys
 from pathlib import Path
-from .app import AutoMotionsApp
-from .interface import CLIInterface
+from urllib.parse import urlsplit
+from .spinner import yaspin
+from . import session, profiling
+from .cache import ResponseCache, default_cache_dir
+from . import parser as html_parser
+from . import info_slide
+from . import api_stats
 from .types import TournamentTagList
 
 def main():
-    parent = argparse.ArgumentParser(add_help=False)
+    network = argparse.ArgumentParser(add_help=False)
+    network.add_argument("--timeout", type=float, help="The timeout of each request to tabbycat in seconds", default=session.DEFAULT_TIMEOUT[1])
+    network.add_argument("--retries", type=int, help="The number of retries of failed requests to tabbycat", default=session.DEFAULT_RETRIES)
+    network.add_argument("--offline", action="store_true", help="Replay responses from the local cache without accessing the network")
+    network.add_argument("--no-cache", action="store_true", help="Disable the local response cache")
+    network.add_argument("--cache-dir", type=lambda x: Path(x).expanduser().resolve(), help="The path of the local response cache", default=default_cache_dir()/"http")
+    network.add_argument("--cache-ttl", type=float, help="Seconds for which cached responses are used without revalidation", default=0)
+    network.add_argument("--parser", type=str, help="The HTML parser engine used for the statistics page", choices=html_parser.ParserEngineList, default="auto")
+    network.add_argument("--stats", type=str, help="Where statistics come from: the statistics page, ballots from the API, or the page with ballots as the fallback", choices=api_stats.StatsEngineList, default="auto")
+    network.add_argument("--info-workers", type=int, help="Processes used to convert info slides to text on tournaments with many slides", default=1)
+    network.add_argument("--stream", action="store_true", help="Stream the statistics page and parse it one round at a time to bound memory")
+    network.add_argument("--timings", type=lambda x: Path(x).resolve(), help="Write a JSON report of how long each phase and request took, and print a summary")
+    network.add_argument("--profile", type=lambda x: Path(x).resolve(), help="Write a cProfile dump of the run, readable with pstats or snakeviz")
+    parent = argparse.ArgumentParser(add_help=False, parents=[network])
     parent.add_argument("--url", "-u", type=str, help="The URL of tabbycat tournament page", required=True)
     parent.add_argument("--year", "-y", type=int, help="The year of the tournament", required=True)
     parent.add_argument("--id", "-i", type=str, help="The ID of the tournament visible in tokyodebate/motions repository", required=True)
     parent.add_argument("--slug", type=str, help="Tournament slug visible in tabbycat")
     parent.add_argument("--type", type=str, help="The type of the tournament", choices=["NA", "Asian", "BP"])
     parent.add_argument("--dir", type=lambda x: Path(x).resolve(), help="The path of the motions directory", default=".")
+    parent.add_argument("--no-dupe-check", action="store_true", help="Skip warning about motions that already exist in the repository")
+    parent.add_argument("--api-token", type=str, help="A Tabbycat API token, for tournaments that don't publish their ballots; only sent to the host of --url")
+    parent.add_argument("--ndjson", type=lambda x: Path(x).resolve(), help="Also write each round to this file as a line of JSON as soon as it is complete")
     
     parser = argparse.ArgumentParser(description="Automatically fetches motion statistics data from tabbycat")
     subparsers = parser.add_subparsers(dest="create_or_update")
@@ -24,7 +47,125 @@ def main():
     # Update tournament
     update_parser =subparsers.add_parser("update", parents=[parent])
     update_parser.add_argument("--location", type=int, help="The save position of the tournament", nargs=2, default=[0, 0])
+    # Ongoing tournament, synced as rounds are released
+    watch_parser = subparsers.add_parser("watch", parents=[parent])
+    watch_parser.add_argument("--location", type=int, help="The save position of the tournament", nargs=2, default=[0, 0])
+    watch_parser.add_argument("--interval", type=float, help="Seconds between polls", default=60)
+    watch_parser.add_argument("--polls", type=int, help="Stop after this many polls (default: until interrupted)")
+    # Batch of tournaments
+    batch_parser = subparsers.add_parser("batch", parents=[network])
+    batch_parser.add_argument("manifest", type=lambda x: Path(x).resolve(), help="The manifest of tournaments to fetch (.json, .csv, .yaml)")
+    batch_parser.add_argument("--dir", type=lambda x: Path(x).resolve(), help="The path of the motions directory", default=".")
+    batch_parser.add_argument("--workers", "-w", type=int, help="The number of tournaments fetched in parallel", default=8)
+    batch_parser.add_argument("--no-dupe-check", action="store_true", help="Skip warning about motions that already exist in the repository")
+    # Statistics of tournaments imported from Tabbycat
+    refresh_parser = subparsers.add_parser("refresh", parents=[network])
+    refresh_parser.add_argument("--dir", type=lambda x: Path(x).resolve(), help="The path of the motions directory", default=".")
+    refresh_parser.add_argument("--id", "-i", type=str, help="Only refresh these tournament IDs", nargs="+")
+    refresh_parser.add_argument("--year", "-y", type=int, help="Only refresh these years", nargs="+")
+    refresh_parser.add_argument("--workers", "-w", type=int, help="The number of tournaments fetched in parallel", default=8)
+    refresh_parser.add_argument("--dry-run", action="store_true", help="Show the changed statistics without writing them")
+    # Rounds as NDJSON, without a repository
+    fetch_parser = subparsers.add_parser("fetch", parents=[network])
+    fetch_parser.add_argument("--url", "-u", type=str, help="The URL of tabbycat tournament page", required=True)
+    fetch_parser.add_argument("--slug", type=str, help="Tournament slug visible in tabbycat")
+    fetch_parser.add_argument("--type", type=str, help="The type of the tournament", choices=["NA", "Asian", "BP"])
+    fetch_parser.add_argument("--api-token", type=str, help="A Tabbycat API token, for tournaments that don't publish their ballots; only sent to the host of --url")
+    fetch_parser.add_argument("--output", "-o", type=str, help="The file written to, one round per line followed by a tournament summary (default: stdout)", default="-")
+    # Search index
+    index_parent = argparse.ArgumentParser(add_help=False)
+    index_parent.add_argument("--dir", type=lambda x: Path(x).resolve(), help="The path of the motions directory", default=".")
+    index_parent.add_argument("--index", type=lambda x: Path(x).expanduser().resolve(), help="The path of the search index (default: in the cache directory)")
+    subparsers.add_parser("index", parents=[index_parent])
+    search_parser = subparsers.add_parser("search", parents=[index_parent])
+    search_parser.add_argument("query", type=str, help="Terms that must all appear in the motion, its info slide, round or tournament", nargs="+")
+    search_parser.add_argument("--limit", "-n", type=int, help="The maximum number of results", default=20)
+    search_parser.add_argument("--raw", action="store_true", help="Pass the query as SQLite FTS5 syntax, e.g. 'motion:nuclear OR info:nuclear'")
+    search_parser.add_argument("--no-update", action="store_true", help="Search without checking the repository for changes first")
+    dupes_parser = subparsers.add_parser("dupes", parents=[index_parent])
+    dupes_parser.add_argument("--threshold", type=float, help="The minimum Jaccard similarity of character 5-grams (default: 0.7)")
     args = parser.parse_args()
+    if args.create_or_update in ("index", "search", "dupes"):
+        run_search(args)
+        return
+    html_parser.configure(args.parser)
+    info_slide.configure(workers=args.info_workers)
+    api_stats.configure(args.stats)
+    if args.offline and args.no_cache:
+        parser.error("--offline requires the cache")
+    session.configure(
+        timeout=(session.DEFAULT_TIMEOUT[0], args.timeout),
+        retries=args.retries,
+        cache=None if args.no_cache else ResponseCache(args.cache_dir, ttl=args.cache_ttl, offline=args.offline),
+        token=(urlsplit(args.url).hostname or "", args.api_token) if getattr(args, "api_token", None) else None,
+    )
+    if args.timings is not None:
+        profiling.enable()
+    profiler = cProfile.Profile() if args.profile is not None else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        run(args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.timings is not None:
+            report = profiling.report()
+            profiling.write_report(args.timings, report)
+            print("\n".join(profiling.format_summary(report)), file=sys.stderr)
+
+def run(args: argparse.Namespace):
+    # Imported here so --help and the search commands don't load the fetch and write paths
+    from .app import AutoMotionsApp, AutoMotionsBatchApp, AutoMotionsWatchApp, AutoMotionsRefreshApp
+    from .interface import CLIInterface
+    from .manifest import load_manifest
+    if args.create_or_update == "fetch":
+        AutoMotionsApp(CLIInterface(args.url, 0, "", tabbycat_tournament_slug=args.slug, tournament_type=args.type, output_formats=["ndjson"], ndjson_output=args.output), stream=args.stream).run()
+        return
+    if args.create_or_update == "batch":
+        interfaces = [
+            CLIInterface(
+                entry["url"],
+                entry["year"],
+                entry["id"],
+                entry["mode"],
+                tabbycat_tournament_slug=entry["slug"],
+                tournament_type=entry["type"],
+                output_path=args.dir,
+                new_name=entry["name"],
+                new_short=entry["short"],
+                new_tag=entry["tag"],
+                new_url=entry["path"],
+                save_pos=entry["location"],
+                check_duplicates=not args.no_dupe_check,
+            )
+            for entry in load_manifest(args.manifest)
+        ]
+        AutoMotionsBatchApp(interfaces, workers=args.workers, stream=args.stream).run()
+        return
+    if args.create_or_update == "refresh":
+        AutoMotionsRefreshApp(args.dir, ids=args.id, years=args.year, workers=args.workers, stream=args.stream, dry_run=args.dry_run).run()
+        return
+    if args.create_or_update == "watch":
+        AutoMotionsWatchApp(
+            CLIInterface(
+                args.url,
+                args.year,
+                args.id,
+                "update",
+                tabbycat_tournament_slug=args.slug,
+                tournament_type=args.type,
+                output_path=args.dir,
+                save_pos=tuple(args.location),
+                check_duplicates=not args.no_dupe_check,
+                output_formats=["git", "ndjson"] if args.ndjson else ["git"],
+                ndjson_output=str(args.ndjson) if args.ndjson else "-",
+            ),
+            interval=args.interval,
+            polls=args.polls,
+        ).run()
+        return
     interface: CLIInterface
     if args.create_or_update == "create":
         interface = CLIInterface(
@@ -40,6 +181,9 @@ def main():
             new_tag=args.tag,
             new_url=args.path,
             save_pos=(0, 0),
+            check_duplicates=not args.no_dupe_check,
+            output_formats=["git", "ndjson"] if args.ndjson else ["git"],
+            ndjson_output=str(args.ndjson) if args.ndjson else "-",
         )
     else:
         interface = CLIInterface(
@@ -51,10 +195,35 @@ def main():
             tournament_type=args.type,
             output_path=args.dir,
             save_pos=tuple(args.location),
+            check_duplicates=not args.no_dupe_check,
+            output_formats=["git", "ndjson"] if args.ndjson else ["git"],
+            ndjson_output=str(args.ndjson) if args.ndjson else "-",
         )
     
-    app = AutoMotionsApp(interface)
+    app = AutoMotionsApp(interface, stream=args.stream)
     app.run()
 
+def run_search(args: argparse.Namespace):
+    from .search import SearchIndex
+    from .similarity import MotionSimilarity, DEFAULT_THRESHOLD
+    with SearchIndex(args.dir, args.index) as index:
+        if args.create_or_update != "search" or not args.no_update:
+            with yaspin(text="Updating search index", color="blue", quiet=args.create_or_update != "index") as spinner:
+                stats = index.update()
+                for failure in stats["failed"]:
+                    spinner.write(f"✗ {failure}")
+                spinner.text = f"Indexed {stats['indexed']} files ({stats['unchanged']} unchanged, {stats['removed']} removed)"
+                spinner.color = "green"
+                spinner.ok("✓")
+        if args.create_or_update == "search":
+            for result in index.search(" ".join(args.query), limit=args.limit, raw=args.raw):
+                print(f"{result['tournament_id']}: {result['tournament']} / {result['round']}")
+                print(f"    {result['motion']}")
+        if args.create_or_update == "dupes":
+            for cluster in MotionSimilarity(index.iter_entries(), threshold=DEFAULT_THRESHOLD if args.threshold is None else args.threshold).clusters():
+                print(f"{len(cluster['motions'])} motions, {cluster['similarity']:.0%} similar or more")
+                for motion in cluster["motions"]:
+                    print(f"    {motion['tournament_id']}: {motion['tournament']} / {motion['round']}: {motion['motion']}")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+from typing import Iterator, Iterable, Optional
+from array import array
+from pathlib import Path
+import json
+import sys
+from .reader import MotionFileReader
+from .repository import TOURNAMENT_LIST_PATH
+from .types import TournamentData, TournamentGroup, TournamentYear, Round, RoundMotion, Motion, MotionStats
+
+# Stat values are counts, so unsigned 32-bit; all stats of a motion share one array
+STATS_TYPECODE = "I"
+
+# (type, number of values) of each stat of a motion. Motions mostly share a handful of layouts, so each is stored once
+StatsLayout = tuple[tuple[str, int], ...]
+_layouts: dict[StatsLayout, StatsLayout] = {}
+
+def _intern_layout(layout: StatsLayout) -> StatsLayout:
+    return _layouts.setdefault(layout, layout)
+
+class CompactMotion:
+    # A round motion without per-object dicts. Fields the motions file doesn't have stay the shared empty string
+    __slots__ = ("seq", "text", "reference", "url", "info_slide", "info_slide_plain", "stats_layout", "stats_values")
+    seq: int
+    text: str
+    reference: str
+    url: str
+    info_slide: str
+    info_slide_plain: str
+    stats_layout: StatsLayout
+    stats_values: Optional[array]
+    def __init__(self, seq: int, text: str, *, reference: str = "", url: str = "", info_slide: str = "", info_slide_plain: str = "", stats: Iterable[MotionStats] = ()):
+        self.seq = seq
+        self.text = text
+        self.reference = reference
+        self.url = url
+        self.info_slide = info_slide
+        self.info_slide_plain = info_slide_plain
+        stats = list(stats)
+        self.stats_layout = _intern_layout(tuple((sys.intern(stat["type_"]), len(stat["value"])) for stat in stats))
+        self.stats_values = array(STATS_TYPECODE, [value for stat in stats for value in stat["value"]]) if stats else None
+
+    @property
+    def stats(self) -> list[MotionStats]:
+        stats: list[MotionStats] = []
+        start = 0
+        for type_, length in self.stats_layout:
+            assert self.stats_values is not None, "Stats values not found"
+            stats.append(MotionStats(type_=type_, value=self.stats_values[start:start + length].tolist()))
+            start += length
+        return stats
+
+    @classmethod
+    def from_dict(cls, round_motion: RoundMotion) -> "CompactMotion":
+        motion = round_motion["motion"]
+        return cls(round_motion["seq"], motion["text"], reference=motion["reference"], url=motion["url"], info_slide=motion["info_slide"], info_slide_plain=motion["info_slide_plain"], stats=round_motion["stats"])
+
+    def to_dict(self) -> RoundMotion:
+        return RoundMotion(
+            motion=Motion(url=self.url, text=self.text, reference=self.reference, info_slide=self.info_slide, info_slide_plain=self.info_slide_plain),
+            seq=self.seq,
+            stats=self.stats,
+        )
+
+class CompactRound:
+    # Round names repeat across every tournament ("Round 1", "Grand Final"), so they are interned
+    __slots__ = ("seq", "name", "pretty_name", "url", "motions")
+    seq: int
+    name: str
+    pretty_name: str
+    url: str
+    motions: tuple[CompactMotion, ...]
+    def __init__(self, seq: int, name: str, motions: Iterable[CompactMotion], *, pretty_name: Optional[str] = None, url: str = ""):
+        self.seq = seq
+        self.name = sys.intern(name)
+        self.pretty_name = self.name if pretty_name is None else sys.intern(pretty_name)
+        self.url = url
+        self.motions = tuple(motions)
+
+    @classmethod
+    def from_dict(cls, round: Round) -> "CompactRound":
+        return cls(round["seq"], round["name"], map(CompactMotion.from_dict, round["motions"]), pretty_name=round["pretty_name"], url=round["url"])
+
+    def to_dict(self) -> Round:
+        return Round(url=self.url, seq=self.seq, motions=[motion.to_dict() for motion in self.motions], name=self.name, pretty_name=self.pretty_name)
+
+class CompactTournamentYear:
+    __slots__ = ("name", "rounds")
+    name: str
+    rounds: tuple[CompactRound, ...]
+    def __init__(self, name: str, rounds: Iterable[CompactRound]):
+        self.name = name
+        self.rounds = tuple(rounds)
+
+    @classmethod
+    def from_dict(cls, tournament_year: TournamentYear) -> "CompactTournamentYear":
+        return cls(tournament_year["name"], map(CompactRound.from_dict, tournament_year["rounds"]))
+
+    def to_dict(self) -> TournamentYear:
+        return TournamentYear(name=self.name, rounds=[round.to_dict() for round in self.rounds])
+
+class CompactTournamentGroup:
+    __slots__ = ("name", "tournaments")
+    name: str
+    tournaments: tuple[CompactTournamentYear, ...]
+    def __init__(self, name: str, tournaments: Iterable[CompactTournamentYear]):
+        self.name = name
+        self.tournaments = tuple(tournaments)
+
+    @classmethod
+    def from_dict(cls, tournament_group: TournamentGroup) -> "CompactTournamentGroup":
+        return cls(tournament_group["name"], map(CompactTournamentYear.from_dict, tournament_group["tournaments"]))
+
+    def to_dict(self) -> TournamentGroup:
+        return TournamentGroup(name=self.name, tournaments=[tournament_year.to_dict() for tournament_year in self.tournaments])
+
+def iter_compact(path: Path) -> Iterator[CompactTournamentGroup]:
+    # Each group is converted as soon as it has been read, so only one group exists as dicts at a time
+    for tournament_group in MotionFileReader(path).iter_tournament_groups():
+        yield CompactTournamentGroup.from_dict(tournament_group)
+
+def load_compact(path: Path) -> list[CompactTournamentGroup]:
+    return list(iter_compact(path))
+
+def load_repository(repository_path: Path) -> dict[str, list[CompactTournamentGroup]]:
+    # Every motions file referenced from TournamentList.json, by its URL; missing files are skipped
+    tournament_list: list[TournamentData] = json.loads((repository_path/TOURNAMENT_LIST_PATH).read_text())
+    files: dict[str, list[CompactTournamentGroup]] = {}
+    for tournament in tournament_list:
+        if tournament["url"] in files or not (repository_path/tournament["url"]).is_file():
+            continue
+        files[tournament["url"]] = load_compact(repository_path/tournament["url"])
+    return files
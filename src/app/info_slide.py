@@ -0,0 +1,248 @@
+from typing import Optional, Iterable
+from collections import OrderedDict
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+import hashlib
+import threading
+from .parser import make_soup
+
+DEFAULT_CACHE_SIZE = 4096
+# Spawning workers takes about a second and a slide converts in well under 0.1 ms,
+# so processes only pay off on very large batches
+PARALLEL_THRESHOLD = 20000
+# Elements that html.parser closes as soon as they open, as bs4 does
+VOID_ELEMENTS = frozenset({"area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame", "hr", "image", "img", "input", "isindex", "keygen", "link", "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr"})
+# Elements whose content html.parser doesn't tokenize as markup
+RAW_TEXT_ELEMENTS = frozenset({"script", "style", "textarea", "title", "xmp", "iframe", "noembed", "noframes", "noscript", "plaintext"})
+# bs4 resolves these two to different characters than the HTML 4 table
+ENTITIES = {name: chr(codepoint) for name, codepoint in name2codepoint.items() if name not in ("lang", "rang")}
+
+class _Unsupported(Exception):
+    pass
+
+class _Frame:
+    __slots__ = ("tag", "depth", "parts", "items", "discard")
+    def __init__(self, tag: str, depth: int, discard: bool):
+        self.tag = tag
+        self.depth = depth
+        self.parts: list[str] = []
+        # Texts of the <li> children of a list
+        self.items: list[str] = []
+        # Children of a list other than <li> don't appear in the output
+        self.discard = discard
+
+    def text(self) -> str:
+        return " ".join([t for t in self.parts if t]).strip().replace("\n ", "\n")
+
+class _InfoSlideParser(HTMLParser):
+    # Produces the same text as walking a BeautifulSoup tree with html.parser, in one pass over the tokens.
+    # Anything where bs4 would build a different tree (stray or misnested end tags, comments, raw text elements,
+    # references it resolves differently) raises _Unsupported so the caller can fall back to bs4
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = [_Frame("", 0, False)]
+        self.data: list[str] = []
+
+    def convert(self, html: str) -> str:
+        self.feed(html)
+        self.close()
+        self._flush()
+        while len(self.stack) > 1:
+            # bs4 closes elements left open at the end of the document
+            self._pop()
+        return self.stack[0].text()
+
+    def handle_starttag(self, tag: str, attrs):
+        if tag in RAW_TEXT_ELEMENTS:
+            raise _Unsupported(tag)
+        self._flush()
+        parent = self.stack[-1]
+        if tag in VOID_ELEMENTS:
+            if tag == "br" and not parent.discard and parent.tag not in ("ul", "ol"):
+                parent.parts.append("\n")
+            return
+        if parent.tag in ("ul", "ol"):
+            # Items are one level deeper than their list
+            frame = _Frame(tag, parent.depth + 1, parent.discard or tag != "li")
+        else:
+            frame = _Frame(tag, parent.depth, parent.discard)
+        self.stack.append(frame)
+
+    def handle_startendtag(self, tag: str, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str):
+        if tag in VOID_ELEMENTS or len(self.stack) == 1 or self.stack[-1].tag != tag:
+            raise _Unsupported(f"</{tag}>")
+        self._flush()
+        self._pop()
+
+    def handle_data(self, data: str):
+        self.data.append(data)
+
+    def handle_entityref(self, name: str):
+        if name not in ENTITIES:
+            raise _Unsupported(f"&{name};")
+        self.data.append(ENTITIES[name])
+
+    def handle_charref(self, name: str):
+        try:
+            codepoint = int(name[1:], 16) if name[:1] in ("x", "X") else int(name)
+        except ValueError:
+            raise _Unsupported(f"&#{name};")
+        # bs4 maps C1 controls through windows-1252 and replaces invalid code points
+        if codepoint == 0 or 0x80 <= codepoint <= 0x9f or 0xd800 <= codepoint <= 0xdfff or codepoint > 0x10ffff:
+            raise _Unsupported(f"&#{name};")
+        self.data.append(chr(codepoint))
+
+    def handle_comment(self, data: str):
+        raise _Unsupported("comment")
+
+    def handle_decl(self, decl: str):
+        raise _Unsupported("declaration")
+
+    def handle_pi(self, data: str):
+        raise _Unsupported("processing instruction")
+
+    def unknown_decl(self, data: str):
+        raise _Unsupported("declaration")
+
+    def _flush(self):
+        # Adjacent text is one string in bs4, so it is stripped as a whole
+        if self.data:
+            frame = self.stack[-1]
+            if not frame.discard and frame.tag not in ("ul", "ol"):
+                frame.parts.append("".join(self.data).strip())
+            self.data = []
+
+    def _pop(self):
+        frame = self.stack.pop()
+        parent = self.stack[-1]
+        if frame.discard:
+            return
+        match frame.tag:
+            case "p":
+                text = frame.text()
+                if text.strip():
+                    parent.parts.append(text.strip() + "\n")
+            case "ul" | "ol":
+                indent = "  " * frame.depth
+                for i, item in enumerate(frame.items, start=1):
+                    bullet = f"{i}. " if frame.tag == "ol" else "- "
+                    parent.parts.append(f"{indent}{bullet}{item.strip()}\n")
+            case "li" if parent.tag in ("ul", "ol"):
+                parent.items.append(frame.text())
+            case "li":
+                parent.parts.append(frame.text().strip())
+            case _:
+                parent.parts.append(frame.text())
+
+def convert_fast(html: str) -> Optional[str]:
+    try:
+        return _InfoSlideParser().convert(html)
+    except _Unsupported:
+        return None
+
+def convert_soup(html: str) -> str:
+    # Info slides are small fragments where other engines repair malformed nesting differently, so they stay on html.parser
+    soup = make_soup(html, "html.parser")
+
+    def handle_element(el, depth=0, in_list=False, list_type=None):
+        text_parts = []
+
+        for child in el.children:
+            if child.name is None:
+                # It's a NavigableString
+                text_parts.append(child.strip())
+            elif child.name == "br":
+                text_parts.append("\n")
+            elif child.name == "p":
+                p_text = handle_element(child, depth)
+                if p_text.strip():
+                    text_parts.append(p_text.strip() + "\n")
+            elif child.name in ("ul", "ol"):
+                for i, li in enumerate(child.find_all("li", recursive=False), start=1):
+                    bullet = f"{i}. " if child.name == "ol" else "- "
+                    li_text = handle_element(li, depth + 1, True, child.name)
+                    indent = "  " * depth
+                    text_parts.append(f"{indent}{bullet}{li_text.strip()}\n")
+            elif child.name == "li":
+                li_text = handle_element(child, depth)
+                text_parts.append(li_text.strip())
+            else:
+                # Recurse for other tags
+                text_parts.append(handle_element(child, depth))
+
+        return " ".join([t for t in text_parts if t]).strip().replace("\n ", "\n")
+
+    result = handle_element(soup)
+    return result.strip()
+
+def convert(html: str) -> str:
+    fast = convert_fast(html)
+    return convert_soup(html) if fast is None else fast.strip()
+
+class InfoSlideConverter:
+    # Converted slides are kept by a hash of their HTML, since the same slide is often used by several divisions and rounds
+    max_size: int
+    workers: int
+    def __init__(self, *, max_size: int = DEFAULT_CACHE_SIZE, workers: int = 1):
+        self.max_size = max_size
+        self.workers = workers
+        self._cache: OrderedDict[bytes, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def convert(self, html: str) -> str:
+        return self.convert_many([html])[0]
+
+    def convert_many(self, htmls: Iterable[str]) -> list[str]:
+        htmls = list(htmls)
+        keys = [self._key(html) for html in htmls]
+        results: dict[bytes, str] = {}
+        todo: dict[bytes, str] = {}
+        with self._lock:
+            for key, html in zip(keys, htmls):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[key] = self._cache[key]
+                elif key not in todo:
+                    todo[key] = html
+        if todo:
+            converted = self._convert_all(list(todo.values()))
+            results.update(zip(todo.keys(), converted))
+            with self._lock:
+                for key, text in zip(todo.keys(), converted):
+                    self._cache[key] = text
+                while len(self._cache) > self.max_size:
+                    self._cache.popitem(last=False)
+        return [results[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _convert_all(self, htmls: list[str]) -> list[str]:
+        if self.workers <= 1 or len(htmls) < PARALLEL_THRESHOLD:
+            return [convert(html) for html in htmls]
+        # Spawned rather than forked, since fetches run in threads
+        from concurrent.futures import ProcessPoolExecutor
+        import multiprocessing
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(convert, htmls, chunksize=max(1, len(htmls) // (self.workers * 4))))
+
+    @staticmethod
+    def _key(html: str) -> bytes:
+        return hashlib.blake2b(html.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+_converter = InfoSlideConverter()
+
+def configure(*, workers: Optional[int] = None, max_size: Optional[int] = None):
+    if workers is not None:
+        _converter.workers = workers
+    if max_size is not None:
+        _converter.max_size = max_size
+
+def get_converter() -> InfoSlideConverter:
+    return _converter
@@ -1,5 +1,17 @@
-from .types import BaseInterface, TabbycatContext
-from .tui import TUIInterface
-from .cli import CLIInterface
+from typing import TYPE_CHECKING
+from importlib import import_module
+from .types import BaseInterface, TabbycatContext, OutputFormat
 
-__all__ = ["BaseInterface", "TabbycatContext", "TUIInterface", "CLIInterface"]
\ No newline at end of file
+if TYPE_CHECKING:
+    from .tui import TUIInterface
+    from .cli import CLIInterface
+
+__all__ = ["BaseInterface", "TabbycatContext", "OutputFormat", "TUIInterface", "CLIInterface"]
+
+# The TUI loads InquirerPy and prompt_toolkit, which the CLI never needs
+_LAZY = {"TUIInterface": ".tui", "CLIInterface": ".cli"}
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,12 +1,13 @@
 from typing import Literal, Optional
 from pathlib import Path
+import sys
 from urllib.parse import urlparse, urljoin
-import requests
-import json
 
-from .types import BaseInterface, TabbycatContext
+from .types import BaseInterface, TabbycatContext, OutputFormat, tournament_source
 from ..types import TournamentData, TournamentTag, TournamentYear
-from ..reader import MotionFileReader
+from ..repository import MotionsRepository, RepositoryTransaction
+from ..reuse import ReusedMotions, describe_reused_motions
+from .. import session, profiling
 
 class CLIInterface(BaseInterface):
     tabbycat_url: str
@@ -21,6 +22,9 @@ class CLIInterface(BaseInterface):
     new_short: Optional[str]
     new_tag: Optional[list[TournamentTag]]
     new_url: Optional[str]
+    check_duplicates: bool
+    output_formats: list[OutputFormat]
+    ndjson_output: str
     def __init__(
         self,
         tabbycat_url: str,
@@ -36,6 +40,9 @@ class CLIInterface(BaseInterface):
         new_tag: Optional[list[TournamentTag]] = None,
         new_url: Optional[str] = None,
         save_pos: Optional[tuple[int, int]] = None,
+        check_duplicates: bool = True,
+        output_formats: Optional[list[OutputFormat]] = None,
+        ndjson_output: str = "-",
     ):
         self.tabbycat_url = tabbycat_url
         self.tabbycat_tournament_slug = tabbycat_tournament_slug
@@ -49,6 +56,9 @@ class CLIInterface(BaseInterface):
         self.new_short = new_short
         self.new_tag = new_tag or []
         self.new_url = new_url
+        self.check_duplicates = check_duplicates
+        self.output_formats = output_formats or ["git"]
+        self.ndjson_output = ndjson_output
         
     def _resolve_url(self, url: str, *, tournament_slug: Optional[str] = None, tournament_type: Optional[Literal["NA", "Asian", "BP"]] = None) -> TabbycatContext:
         base_url = urljoin(url, "/")
@@ -59,24 +69,28 @@ class CLIInterface(BaseInterface):
             tournament_slug = tournament_slug if tournament_slug not in {"", "accounts", "api", "archive", "create", "database", "notifications"} else None
         # If URL doesn't contain tournament slug, check if there is only one tournament
         if tournament_slug is None:
-            response = requests.get(urljoin(base_url, "/api/v1/tournaments"))
+            response = session.get(urljoin(base_url, "/api/v1/tournaments"))
             response.raise_for_status()
             tournaments: list[dict] = response.json()
             assert len(tournaments) == 1, f"Expected 1 tournament, got {len(tournaments)} tournaments. Include tournament slug in URL or specify tournament slug."
             tournament_slug = tournaments[0]["slug"]
             tournament_name = tournaments[0]["name"]
         else:
-            response = requests.get(urljoin(base_url, f"/api/v1/tournaments/{tournament_slug}"))
+            response = session.get(urljoin(base_url, f"/api/v1/tournaments/{tournament_slug}"))
             response.raise_for_status()
             tournament = response.json()
             tournament_name = tournament["name"]
         return TabbycatContext(base_url=base_url, tournament_slug=tournament_slug, tournament_type=tournament_type,tournament_name=tournament_name)
 
     def get_context(self) -> TabbycatContext:
-        return self._resolve_url(self.tabbycat_url, tournament_slug=self.tabbycat_tournament_slug, tournament_type=self.tournament_type)
+        with profiling.span("resolve_url", url=self.tabbycat_url):
+            return self._resolve_url(self.tabbycat_url, tournament_slug=self.tabbycat_tournament_slug, tournament_type=self.tournament_type)
     
-    def get_output_format(self) -> list[Literal["clipboard_text", "clipboard_table", "git"]]:
-        return ["git"]
+    def get_output_format(self) -> list[OutputFormat]:
+        return list(self.output_formats)
+
+    def get_ndjson_output(self) -> str:
+        return self.ndjson_output
     
     def get_git_repository(self, ctx: TabbycatContext) -> Path:
         root = Path(".").resolve() if self.output_path is None else Path(self.output_path).resolve()
@@ -85,21 +99,23 @@ class CLIInterface(BaseInterface):
         return root
         
     def handle_git(self, ctx: TabbycatContext, repository_path: Path, tournament_data: TournamentYear):
-        tournament_list_file: Path = repository_path/"Javascript"/"TournamentList.json"
-        tournament_list: list[TournamentData] = json.loads(tournament_list_file.read_text())
+        if self.check_duplicates:
+            # Warnings go to stderr, so they never mix with output piped from stdout
+            with ReusedMotions(repository_path) as reused:
+                for warning in describe_reused_motions(reused, tournament_data):
+                    print(warning, file=sys.stderr)
+        with MotionsRepository(repository_path).transaction() as transaction:
+            self.queue_git(ctx, transaction, tournament_data)
+
+    def queue_git(self, ctx: TabbycatContext, transaction: RepositoryTransaction, tournament_data: TournamentYear):
         tournament_metadata: TournamentData
         match self.update_or_create:
             case "update":
-                tournament_metadata = next(t for t in tournament_list if t["id"] == self.id)
-                tournament_metadata["latest"] = self.latest
+                tournament_metadata = transaction.update_latest(self.id, self.latest)
             case "create":
                 assert self.new_name is not None, "New name is required for creating a new tournament"
                 assert self.new_tag is not None, "New tag is required for creating a new tournament"
                 assert self.new_url is not None, "New URL is required for creating a new tournament"
-                assert all(d["id"] != self.id for d in tournament_list), "Tournament ID already exists"
-                assert not (repository_path/self.new_url).exists(), f"Tournament file {self.new_url} already exists"
-                with open(repository_path/self.new_url, "w") as f:
-                    f.write(self.new_name)
                 tournament_metadata = {
                     "id": self.id,
                     "name": self.new_name,
@@ -108,12 +124,19 @@ class CLIInterface(BaseInterface):
                     "tag": self.new_tag,
                     "url": self.new_url,
                 }
-                tournament_list.append(tournament_metadata)
+                transaction.create_tournament(tournament_metadata)
         # Save tournament to file
-        motion_file_reader = MotionFileReader(repository_path/tournament_metadata["url"])
-        tournament_groups = motion_file_reader.get_tournament_groups()
         assert self.save_pos is not None, "Save position is required"
-        tournament_groups[self.save_pos[0]]["tournaments"].insert(self.save_pos[1], tournament_data)
-        motion_file_reader.write_to_file(motion_file_reader.tournament_groups_to_lines(tournament_groups))
-        # Save tournament list
-        tournament_list_file.write_text(json.dumps(tournament_list, indent=4))
\ No newline at end of file
+        transaction.insert(tournament_metadata["url"], self.save_pos, tournament_data)
+        transaction.record_source(self.id, tournament_source(ctx, self.latest))
+
+    def sync_git(self, ctx: TabbycatContext, transaction: RepositoryTransaction, tournament_data: TournamentYear) -> bool:
+        # Replaces the tournament at the save position when it was written by an earlier sync, and inserts it otherwise.
+        # Returns whether it was inserted
+        assert self.save_pos is not None, "Save position is required"
+        tournament_metadata = transaction.update_latest(self.id, self.latest)
+        transaction.record_source(self.id, tournament_source(ctx, self.latest))
+        if transaction.replace(tournament_metadata["url"], self.save_pos, tournament_data):
+            return False
+        transaction.insert(tournament_metadata["url"], self.save_pos, tournament_data)
+        return True
\ No newline at end of file
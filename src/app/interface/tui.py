@@ -8,16 +8,19 @@ from requests.models import stream_decode_response_unicode
 from yaspin import yaspin
 from urllib.parse import urlparse, urljoin
 from typing import Literal
-import json
 import re
 
-from .types import BaseInterface, TabbycatContext
+from .types import BaseInterface, TabbycatContext, OutputFormat, tournament_source
 from ..types import TournamentData, TournamentTag, TournamentYear
-from ..reader import MotionFileReader
+from ..repository import MotionsRepository, RepositoryTransaction
+from ..reuse import ReusedMotions, describe_reused_motions
+from ..tournament_index import load_tournament_index
+from .. import session
 
 # pyright: reportPrivateImportUsage=false
 
 class TUIInterface(BaseInterface):
+    ndjson_output: str = "-"
     def get_context(self) -> TabbycatContext:
         def validate_url(url: str) -> bool:
             try:
@@ -30,7 +33,7 @@ class TUIInterface(BaseInterface):
         # Check for API endpoint
         with yaspin(text="Fetching tournaments", color="blue") as spinner:
             try:
-                response = requests.get(urljoin(answer["base_url"], "/api/v1/tournaments"))
+                response = session.get(urljoin(answer["base_url"], "/api/v1/tournaments"))
                 response.raise_for_status()
                 tournaments = response.json()
                 if answer["tournament_slug"] is not None: #Tournament slug is already provided within URL
@@ -72,16 +75,26 @@ class TUIInterface(BaseInterface):
         answer["tournament_type"] = tournament_type
         return answer
     
-    def get_output_format(self) -> list[Literal["clipboard_text", "clipboard_table", "git"]]:
-        answer: list[Literal["clipboard_text", "clipboard_table", "git"]] = inquirer.checkbox(
+    def get_output_format(self) -> list[OutputFormat]:
+        answer: list[OutputFormat] = inquirer.checkbox(
             "Select the output formats:",
             choices=[
                 Choice(name="Copy text data to clipboard", value="clipboard_text", enabled=False),
                 Choice(name="Copy table data to clipboard", value="clipboard_table", enabled=True),
                 Choice(name="Save to tokyodebate/motions repository", value="git", enabled=True),
+                Choice(name="Write rounds to an NDJSON file", value="ndjson", enabled=False),
             ]
         ).execute()
+        if "ndjson" in answer:
+            self.ndjson_output = str(inquirer.filepath(
+                "Enter path of the NDJSON file:",
+                validate=lambda x: bool(x) and Path(x).expanduser().resolve().parent.is_dir(),
+                filter=lambda x: Path(x).expanduser().resolve()
+            ).execute())
         return answer
+
+    def get_ndjson_output(self) -> str:
+        return self.ndjson_output
     
     def get_git_repository(self, ctx: TabbycatContext) -> Path:
         # Select the git repository
@@ -102,34 +115,40 @@ class TUIInterface(BaseInterface):
         return folder_path
         
     def handle_git(self, ctx: TabbycatContext, repository_path: Path, tournament_data: TournamentYear):
-        # Load tournament list
-        tournament_list_file: Path = repository_path/"Javascript"/"TournamentList.json"
-        tournament_list: list[TournamentData] = json.loads(tournament_list_file.read_text())
+        with MotionsRepository(repository_path).transaction() as transaction:
+            self._queue_git(ctx, transaction, tournament_data)
+
+    def _queue_git(self, ctx: TabbycatContext, transaction: RepositoryTransaction, tournament_data: TournamentYear):
+        tournament_list = transaction.tournament_list
+        repository_path = transaction.repository.path
         def get_name(tournament: TournamentData) -> str:
             if tournament["short"]:
                 return f"{tournament['name']} ({tournament['short']})"
             else:
                 return tournament["name"]
-        # Search for tournament
-        default = " ".join(part for part in ctx["tournament_name"].split(" ") if part.isalpha()) if ctx["tournament_name"] else None
+        # Search for tournament, with the closest matches to the Tabbycat name listed first
+        ranked = load_tournament_index(transaction.repository.tournament_list_file).order(ctx["tournament_name"])
         tournament_select: TournamentData|Literal["new"] = inquirer.fuzzy(
             "Select the tournament to load:",
             long_instruction="Type \"New tournament\" to create a new tournament",
-            choices=[Choice(name=get_name(tournament), value=f"id:{tournament['id']}") for tournament in tournament_list] + [Choice(name="New tournament", value="new")],
-            default=default,
+            choices=[Choice(name=get_name(tournament), value=f"id:{tournament['id']}") for tournament in ranked] + [Choice(name="New tournament", value="new")],
             validate=lambda x: x is not None,
             filter=lambda x: next(t for t in tournament_list if t["id"] == x[3:]) if x.startswith("id:") else x
         ).execute()
         # Create new tournament & add to list
         if tournament_select == "new":
             tournament_select = self._get_new_tournament_data(repository_path, tournament_list)
-            with yaspin(text=f"Creating {tournament_select['url']}", color="blue") as spinner:
-                with open(repository_path/tournament_select["url"], "w") as f:
-                    f.write(tournament_select["name"])
-            tournament_list.append(tournament_select)
+            transaction.create_tournament(tournament_select)
+        # Warn about motions that are already in the repository
+        with yaspin(text="Checking for motions already in the repository", color="blue") as spinner, ReusedMotions(repository_path) as reused:
+            warnings = describe_reused_motions(reused, tournament_data)
+            for warning in warnings:
+                spinner.write(warning)
+            spinner.text = f"Found {len(warnings)} motions already in the repository" if warnings else "No motions already in the repository"
+            spinner.color = "green"
+            spinner.ok("✓")
         # Prompt for where to save in the tournament file
-        motion_file_reader = MotionFileReader(repository_path/tournament_select["url"])
-        tournament_groups = motion_file_reader.get_tournament_groups()
+        tournament_groups = transaction.get_tournament_groups(tournament_select["url"])
         choices = []
         for i, tg in enumerate(tournament_groups):
             if i > 0:
@@ -143,7 +162,7 @@ class TUIInterface(BaseInterface):
             "Select the position to insert the tournament:",
             choices=choices
         ).execute()
-        tournament_groups[insert_position[0]]["tournaments"].insert(insert_position[1], tournament_data)
+        transaction.insert(tournament_select["url"], insert_position, tournament_data)
         # Refresh tournament list
         default = match.group() if ctx["tournament_name"] and (match := re.search(r"\d{4}", ctx["tournament_name"])) else ""
         year: int = inquirer.text(
@@ -152,15 +171,11 @@ class TUIInterface(BaseInterface):
             filter=int,
             default=default
         ).execute()
-        tournament_select["latest"] = year
-        with yaspin(text=f"Writing to {str(motion_file_reader.path)}", color="blue") as spinner:
-            motion_file_reader.write_to_file(motion_file_reader.tournament_groups_to_lines(tournament_groups))
-            spinner.text = f"Written to {str(motion_file_reader.path)}"
-            spinner.color = "green"
-            spinner.ok("✓")
-        with yaspin(text="Updating tournament list", color="blue") as spinner:
-            tournament_list_file.write_text(json.dumps(tournament_list, indent=4))
-            spinner.text = "Updated tournament list"
+        transaction.update_latest(tournament_select["id"], year)
+        transaction.record_source(tournament_select["id"], tournament_source(ctx, year))
+        with yaspin(text=f"Writing to {tournament_select['url']} and tournament list", color="blue") as spinner:
+            transaction.commit()
+            spinner.text = f"Written to {tournament_select['url']} and tournament list"
             spinner.color = "green"
             spinner.ok("✓")
         
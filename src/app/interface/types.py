@@ -2,7 +2,7 @@ from abc import ABC, abstractmethod
 from typing import TypedDict, Literal
 from pathlib import Path
 
-from ..types import TournamentData, TournamentYear
+from ..types import TournamentData, TournamentYear, TournamentSource
 
 class TabbycatContext(TypedDict):
     base_url: str
@@ -10,14 +10,28 @@ class TabbycatContext(TypedDict):
     tournament_name: str|None
     tournament_type: Literal["NA", "Asian", "BP"]|None
 
+def tournament_source(ctx: TabbycatContext, year: int) -> TournamentSource:
+    assert ctx["tournament_name"], "Tournament name not found"
+    assert ctx["tournament_slug"], "Tournament slug not found"
+    source = TournamentSource(name=ctx["tournament_name"], year=year, url=ctx["base_url"], slug=ctx["tournament_slug"])
+    if ctx["tournament_type"] is not None:
+        source["type"] = ctx["tournament_type"]
+    return source
+
+OutputFormat = Literal["clipboard_text", "clipboard_table", "git", "ndjson"]
+
 class BaseInterface(ABC):
     @abstractmethod
     def get_context(self) -> TabbycatContext:
         pass
     
     @abstractmethod
-    def get_output_format(self) -> list[Literal["clipboard_text", "clipboard_table", "git"]]:
+    def get_output_format(self) -> list[OutputFormat]:
         pass
+
+    def get_ndjson_output(self) -> str:
+        # "-" is stdout
+        return "-"
     
     @abstractmethod
     def get_git_repository(self, ctx: TabbycatContext) -> Path:
@@ -0,0 +1,91 @@
+from typing import TypedDict, Literal, Optional, Any
+from pathlib import Path
+import csv
+import json
+import re
+from .types import TournamentTag, TournamentTagList
+
+class ManifestEntry(TypedDict):
+    mode: Literal["update", "create"]
+    url: str
+    id: str
+    year: int
+    slug: Optional[str]
+    type: Optional[Literal["NA", "Asian", "BP"]]
+    location: tuple[int, int]
+    name: Optional[str]
+    short: Optional[str]
+    tag: list[TournamentTag]
+    path: Optional[str]
+
+def load_manifest(path: Path) -> list[ManifestEntry]:
+    match path.suffix.lower():
+        case ".json":
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if isinstance(data, dict):
+                data = data.get("tournaments", [])
+        case ".yaml" | ".yml":
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("PyYAML is required for YAML manifests. Install it with `uv sync --extra yaml`.") from e
+            data = yaml.safe_load(path.read_text(encoding="utf-8")) or []
+            if isinstance(data, dict):
+                data = data.get("tournaments", [])
+        case ".csv":
+            with open(path, newline="", encoding="utf-8") as f:
+                data = [row for row in csv.DictReader(f) if any(value and value.strip() for value in row.values())]
+        case _:
+            raise ValueError(f"Unsupported manifest format: {path.suffix}")
+    if not isinstance(data, list):
+        raise ValueError("Manifest must be a list of tournaments")
+    return [_parse_entry(raw, i) for i, raw in enumerate(data, start=1)]
+
+def _parse_entry(raw: dict[str, Any], index: int) -> ManifestEntry:
+    def get(key: str) -> Optional[str]:
+        value = raw.get(key)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            return None
+        return str(value).strip()
+
+    def require(key: str) -> str:
+        value = get(key)
+        if value is None:
+            raise ValueError(f"Manifest entry {index}: '{key}' is required")
+        return value
+
+    location = raw.get("location") or [0, 0]
+    if isinstance(location, str):
+        location = re.findall(r"\d+", location)
+    if len(location) != 2:
+        raise ValueError(f"Manifest entry {index}: 'location' must have 2 values")
+    tag = raw.get("tag") or []
+    if isinstance(tag, str):
+        tag = [t for t in re.split(r"[\s,;|]+", tag) if t]
+    for t in tag:
+        if t not in TournamentTagList:
+            raise ValueError(f"Manifest entry {index}: invalid tag {t}")
+    tournament_type = get("type")
+    if tournament_type not in (None, "NA", "Asian", "BP"):
+        raise ValueError(f"Manifest entry {index}: invalid type {tournament_type}")
+    mode = get("mode") or ("create" if get("name") else "update")
+    if mode not in ("update", "create"):
+        raise ValueError(f"Manifest entry {index}: invalid mode {mode}")
+    if mode == "create":
+        require("name")
+        require("path")
+        if not tag:
+            raise ValueError(f"Manifest entry {index}: 'tag' is required for creating a new tournament")
+    return ManifestEntry(
+        mode=mode, # type: ignore
+        url=require("url"),
+        id=require("id"),
+        year=int(require("year")),
+        slug=get("slug"),
+        type=tournament_type, # type: ignore
+        location=(int(location[0]), int(location[1])),
+        name=get("name"),
+        short=get("short"),
+        tag=tag,
+        path=get("path"),
+    )
@@ -0,0 +1,56 @@
+from typing import Optional
+from difflib import SequenceMatcher
+import hashlib
+import re
+from .types import RoundMotion
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+def text_key(text: str) -> str:
+    return hashlib.blake2b(normalize_text(text).encode(), digest_size=16).hexdigest()
+
+class MotionMatcher:
+    round_motions: list[RoundMotion]
+    def __init__(self, round_motions: list[RoundMotion]):
+        self.round_motions = round_motions
+        self._by_reference_and_text: dict[tuple[str, str], RoundMotion] = {}
+        self._by_text: dict[str, RoundMotion] = {}
+        for round_motion in round_motions:
+            key = text_key(round_motion["motion"]["text"])
+            self._by_reference_and_text.setdefault((normalize_text(round_motion["motion"]["reference"]), key), round_motion)
+            self._by_text.setdefault(key, round_motion)
+        self._scores: dict[tuple[str, str], float] = {}
+
+    def match(self, text: str, reference: str) -> tuple[Optional[RoundMotion], float]:
+        key = text_key(text)
+        round_motion = self._by_reference_and_text.get((normalize_text(reference), key)) or self._by_text.get(key)
+        if round_motion is not None:
+            return round_motion, self.score(text, round_motion["motion"]["text"])
+        return self._best_match(text)
+
+    def score(self, a: str, b: str) -> float:
+        if a == b:
+            return 1.0
+        score = self._scores.get((a, b))
+        if score is None:
+            score = self._scores[(a, b)] = SequenceMatcher(None, a, b).ratio()
+        return score
+
+    def _best_match(self, text: str) -> tuple[Optional[RoundMotion], float]:
+        # Same argmax as comparing against every motion, but candidates whose upper bound
+        # can't beat the best score so far are never fully compared
+        best: Optional[RoundMotion] = None
+        best_score = -1.0
+        matcher = SequenceMatcher(None, text)
+        for round_motion in self.round_motions:
+            candidate = round_motion["motion"]["text"]
+            score = self._scores.get((text, candidate))
+            if score is None:
+                matcher.set_seq2(candidate)
+                if matcher.real_quick_ratio() <= best_score or matcher.quick_ratio() <= best_score:
+                    continue
+                score = self._scores[(text, candidate)] = matcher.ratio()
+            if score > best_score:
+                best, best_score = round_motion, score
+        return best, best_score
@@ -1,63 +1,185 @@
-from typing import TypedDict, Literal
+from typing import TYPE_CHECKING, TypedDict, Literal, Optional, Iterable, Callable
+import codecs
 from urllib.parse import urljoin
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 import requests
-from bs4 import BeautifulSoup, Tag
-from difflib import SequenceMatcher
-from yaspin import yaspin
 from .interface.types import TabbycatContext
 from .types import Round, Motion, MotionStats, RoundMotion, TournamentYear
 from .utils import parse_round
+from .matcher import MotionMatcher
+from .parser import iter_round_tiles, make_soup
+from .info_slide import get_converter, convert
+from .api_stats import StatsEngine, DebateResult, RESULTS_WORKERS, pairings_path, ballots_path, parse_debate, infer_tournament_type, round_stats
+from .spinner import yaspin
+from . import session, profiling, api_stats
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
 
 class MotionManager:
     ctx: TabbycatContext
     rounds: list[Round]
-    def __init__(self, ctx: TabbycatContext):
+    rounds_by_url: dict[str, Round]
+    rounds_by_name: dict[str, Round]
+    round_motions_by_url: dict[str, list[RoundMotion]]
+    quiet: bool
+    stream: bool
+    on_round: Optional[Callable[[Round], None]]
+    stats_engine: StatsEngine
+    def __init__(self, ctx: TabbycatContext, *, quiet: bool = False, stream: bool = False, on_round: Optional[Callable[[Round], None]] = None, stats_engine: Optional[StatsEngine] = None):
         self.ctx = ctx
         self.rounds = []
+        self.rounds_by_url = {}
+        self.rounds_by_name = {}
+        self.round_motions_by_url = {}
+        self.quiet = quiet
+        self.stream = stream
+        # Called with each round as soon as its motions and stats are complete
+        self.on_round = on_round
+        # "html" scrapes the statistics page, "api" computes the stats from ballots, "auto" falls back to ballots when the page fails
+        self.stats_engine = stats_engine or api_stats.get_engine()
+        self._completed: set[str] = set()
+        # Rounds the API reports as completed and not silent, whose results the tournament has released
+        self._released: set[str] = set()
 
     def get_data(self) -> TournamentYear:
-        self._fetch_api()
-        html = requests.get(urljoin(self.ctx["base_url"], f"/{self.ctx['tournament_slug']}/motions/statistics/")).text
-        self._scrape_motion_statistics(BeautifulSoup(html, "html.parser"))
+        # Rounds, motions and statistics don't depend on each other, so they are fetched together
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            statistics_future = executor.submit(self._get, f"/{self.ctx['tournament_slug']}/motions/statistics/", stream=self.stream) if self.stats_engine != "api" else None
+            self._fetch_api(executor)
+            page_read = False
+            if statistics_future is not None:
+                try:
+                    self._read_statistics(statistics_future)
+                    page_read = True
+                except (requests.RequestException, AssertionError, ValueError):
+                    if self.stats_engine == "html":
+                        raise
+        # Every round is computed from ballots when the page failed or had no round tiles, as a hidden page served as a
+        # login page does. Otherwise the page leaves out silent and unreleased rounds on purpose, so only released rounds
+        # it didn't complete are
+        if self.stats_engine != "html":
+            fallback = not page_read or not self._completed
+            try:
+                self._fetch_results([round for round in self.rounds if round["motions"] and round["url"] not in self._completed and (fallback or round["url"] in self._released)])
+            except requests.RequestException:
+                # Ballots may be private, and the page still gave the stats it has
+                if not page_read:
+                    raise
+        # Rounds without statistics are complete once the page has been read
+        for round in self.rounds:
+            self._complete_round(round)
         assert self.ctx["tournament_name"], "Tournament name not found"
         return {
             "name": self.ctx["tournament_name"],
             "rounds": self.rounds
         }
 
-    def _fetch_api(self):
-        with yaspin(text="Fetching rounds", color="blue") as spinner:
-            rounds = requests.get(urljoin(self.ctx["base_url"], f"/api/v1/tournaments/{self.ctx['tournament_slug']}/rounds")).json()
-            for round_data in rounds:
-                self.rounds.append(Round(url=round_data["url"], seq=round_data["seq"], name=round_data["name"], motions=[], pretty_name=parse_round(round_data["name"])))
+    def _read_statistics(self, statistics_future: Future[requests.Response]):
+        statistics_response = statistics_future.result()
+        if self.stream:
+            with statistics_response:
+                self._scrape_round_tiles(iter_round_tiles(self._iter_text(statistics_response)))
+        else:
+            with profiling.span("parse_html", bytes=len(statistics_response.content)):
+                soup = make_soup(statistics_response.text)
+            self._scrape_motion_statistics(soup)
+
+    def _get(self, path: str, *, stream: bool = False) -> requests.Response:
+        response = session.get(urljoin(self.ctx["base_url"], path), stream=stream)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _iter_text(response: requests.Response, chunk_size: int = 64 * 1024) -> Iterable[str]:
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        for chunk in response.iter_content(chunk_size):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+    def _fetch_api(self, executor: Optional[Executor] = None):
+        if executor is None:
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                return self._fetch_api(executor)
+        rounds_future = executor.submit(self._get, f"/api/v1/tournaments/{self.ctx['tournament_slug']}/rounds")
+        motions_future = executor.submit(self._get, f"/api/v1/tournaments/{self.ctx['tournament_slug']}/motions")
+        with yaspin(text="Fetching rounds", color="blue", quiet=self.quiet) as spinner:
+            rounds_response = rounds_future.result()
+            with profiling.span("decode_json", bytes=len(rounds_response.content)):
+                rounds = rounds_response.json()
+            self._add_rounds(rounds)
             spinner.text = f"Fetched {len(rounds)} rounds"
             spinner.color = "green"
             spinner.ok("✓")
-        with yaspin(text="Fetching motions", color="blue") as spinner:
-            motions = requests.get(urljoin(self.ctx["base_url"], f"/api/v1/tournaments/{self.ctx['tournament_slug']}/motions")).json()
-            for motion_data in motions:
-                motion = Motion(url=motion_data["url"], text=motion_data["text"], reference=motion_data["reference"], info_slide=motion_data["info_slide"], info_slide_plain=self._prettify_info(motion_data["info_slide"]))
-                for round_data in motion_data["rounds"]:
-                    found_round = next((round for round in self.rounds if round["url"] == round_data["round"]), None)
-                    if found_round is not None:
-                        found_round["motions"].append(RoundMotion(motion=motion, seq=round_data["seq"], stats=[]))
+        with yaspin(text="Fetching motions", color="blue", quiet=self.quiet) as spinner:
+            motions_response = motions_future.result()
+            with profiling.span("decode_json", bytes=len(motions_response.content)):
+                motions = motions_response.json()
+            self._add_motions(motions)
             spinner.text = f"Fetched {len(motions)} motions"
             spinner.color = "green"
             spinner.ok("✓")
+        self._sort_rounds()
+
+    def _add_rounds(self, rounds: list[dict]) -> list[Round]:
+        # Rounds already known by URL are skipped, so the same response can be applied again
+        added: list[Round] = []
+        for round_data in rounds:
+            # A known round may have been completed since it was added
+            if round_data.get("completed") and not round_data.get("silent"):
+                self._released.add(round_data["url"])
+            if round_data["url"] in self.rounds_by_url:
+                continue
+            round = Round(url=round_data["url"], seq=round_data["seq"], name=round_data["name"], motions=[], pretty_name=parse_round(round_data["name"]))
+            self.rounds.append(round)
+            self.rounds_by_url[round["url"]] = round
+            added.append(round)
+        return added
+
+    def _add_motions(self, motions: list[dict]) -> list[Round]:
+        # Returns the rounds that motions were added to; motions already known by URL are skipped
+        changed: dict[str, Round] = {}
+        new_motions = [motion_data for motion_data in motions if motion_data["url"] not in self.round_motions_by_url]
+        # Converted together, so repeated slides are converted once
+        with profiling.span("prettify_info", slides=len(new_motions)):
+            info_slides_plain = get_converter().convert_many(motion_data["info_slide"] for motion_data in new_motions)
+        for motion_data, info_slide_plain in zip(new_motions, info_slides_plain):
+            if motion_data["url"] in self.round_motions_by_url:
+                continue
+            motion = Motion(url=motion_data["url"], text=motion_data["text"], reference=motion_data["reference"], info_slide=motion_data["info_slide"], info_slide_plain=info_slide_plain)
+            for round_data in motion_data["rounds"]:
+                found_round = self.rounds_by_url.get(round_data["round"])
+                if found_round is not None:
+                    round_motion = RoundMotion(motion=motion, seq=round_data["seq"], stats=[])
+                    found_round["motions"].append(round_motion)
+                    self.round_motions_by_url.setdefault(motion["url"], []).append(round_motion)
+                    changed[found_round["url"]] = found_round
+        return list(changed.values())
+
+    def _sort_rounds(self):
         self.rounds.sort(key=lambda x: x["seq"])
+        self.rounds_by_name = {}
         for round in self.rounds:
             round["motions"].sort(key=lambda x: x["seq"])
+            # Earliest round wins on duplicate names
+            self.rounds_by_name.setdefault(round["name"], round)
     
-    def _scrape_motion_statistics(self, soup: BeautifulSoup):
-        round_tiles = soup.select("div.container-fluid > div:last-child > div.col > div.list-group.mt-3")
+    def _scrape_motion_statistics(self, soup: "BeautifulSoup"):
+        self._scrape_round_tiles(soup.select("div.container-fluid > div:last-child > div.col > div.list-group.mt-3"))
+
+    def _scrape_round_tiles(self, round_tiles: Iterable["Tag"]):
         for round_tile in round_tiles:
             # Round name
             round_name_element = round_tile.select_one("span.badge.badge-secondary")
             assert round_name_element, "Round name element not found"
-            round_obj = next((round for round in self.rounds if round["name"] == round_name_element.text), None)
+            round_obj = self.rounds_by_name.get(round_name_element.text)
             assert round_obj, "Round object not found"
+            # A page read again replaces the stats of the round
+            for round_motion in round_obj["motions"]:
+                round_motion["stats"] = []
             # Motion tile
             motion_tiles = round_tile.select(":scope > div:not(:first-child)")
+            matcher = MotionMatcher(round_obj["motions"])
             for motion_tile in motion_tiles:
                 # Matching motion
                 motion_h4 = motion_tile.select_one("h4")
@@ -66,46 +188,94 @@ class MotionManager:
                 reference_element = motion_h4.select_one("small.text-muted")
                 assert reference_element, "Reference element not found"
                 reference = reference_element.text.strip()[1:-1] # Remove parenthesis
-                #motion_obj = next((round_motion for round_motion in round_obj["motions"] if round_motion["motion"]["reference"] == reference), None)
-                motion_obj = max(round_obj["motions"], key=lambda x: SequenceMatcher(None,motion_text, x["motion"]["text"]).ratio())
+                with profiling.span("match_motion"):
+                    motion_obj, similarity = matcher.match(motion_text, reference)
                 assert motion_obj, "Motion object not found"
                 assert motion_obj["motion"]["reference"] == reference, "Reference mismatch"
-                assert SequenceMatcher(None, motion_text, motion_obj["motion"]["text"]).ratio() > 0.9, "Motion text mismatch"
+                assert similarity > 0.9, "Motion text mismatch"
                 # Extract stats
-                stats_element = motion_tile.select_one(":scope > div.row:last-child")
-                assert stats_element, "Stats element not found"
-                if self.ctx["tournament_type"] is None:
-                    with yaspin(text="Inferring tournament type...", color="blue") as spinner:
-                        self.ctx["tournament_type"] = self._infer_tournament_type(stats_element)
-                        spinner.text = f"Tournament type inferred as {self.ctx['tournament_type']}"
-                        spinner.color = "green"
-                        spinner.ok("✓")
-                match self.ctx["tournament_type"]:
-                    case "NA":
-                        motion_obj["stats"] = self._extract_na_stats(stats_element)
-                    case "Asian":
-                        motion_obj["stats"] = self._extract_asian_stats(stats_element)
-                    case "BP":
-                        motion_obj["stats"] = self._extract_bp_stats(stats_element)
-                    case _:
-                        raise ValueError("Invalid tournament type")
+                with profiling.span("extract_stats"):
+                    stats_element = motion_tile.select_one(":scope > div.row:last-child")
+                    assert stats_element, "Stats element not found"
+                    if self.ctx["tournament_type"] is None:
+                        with yaspin(text="Inferring tournament type...", color="blue", quiet=self.quiet) as spinner:
+                            self.ctx["tournament_type"] = self._infer_tournament_type(stats_element)
+                            spinner.text = f"Tournament type inferred as {self.ctx['tournament_type']}"
+                            spinner.color = "green"
+                            spinner.ok("✓")
+                    match self.ctx["tournament_type"]:
+                        case "NA":
+                            motion_obj["stats"] = self._extract_na_stats(stats_element)
+                        case "Asian":
+                            motion_obj["stats"] = self._extract_asian_stats(stats_element)
+                        case "BP":
+                            motion_obj["stats"] = self._extract_bp_stats(stats_element)
+                        case _:
+                            raise ValueError("Invalid tournament type")
             if self.ctx["tournament_type"] == "Asian":
-                # Fill missing (undisplayed) stats - rooms without any matches (may include vetoes, but stats are unknown)
-                total_rooms = 0
-                for round_motion in round_obj["motions"]:
-                    stat_balance = next((stat for stat in round_motion["stats"] if stat["type_"] == "Balance"), None)
-                    stat_veto = next((stat for stat in round_motion["stats"] if stat["type_"] == "Veto"), None)
-                    if not stat_balance:
-                        stat_balance = MotionStats(type_="Balance", value=[0, 0])
-                        round_motion["stats"].insert(0, stat_balance)
-                    total_rooms += stat_balance["value"][0] + stat_balance["value"][1]
-                for round_motion in round_obj["motions"]:
-                    assert round_motion["stats"][0]["type_"] == "Balance", "Expected Balance stat"
-                    round_motion["stats"][0]["value"].append(total_rooms)
-                    if len(round_motion["stats"]) == 2:
-                        round_motion["stats"][1]["value"].append(total_rooms * 2)
-
-    def _infer_tournament_type(self, row_element: Tag) -> Literal["NA", "Asian", "BP"]:
+                self._fill_asian_totals(round_obj)
+            self._complete_round(round_obj)
+
+    def _fetch_results(self, rounds: list[Round]):
+        # Pairings of every round are requested at once, and the ballots of each debate as soon as its round's pairings arrive.
+        # Rounds are aggregated in order as their ballots come in
+        if not rounds:
+            return
+        for round in rounds:
+            # Stats the page left half-written are computed again
+            for round_motion in round["motions"]:
+                round_motion["stats"] = []
+        with ThreadPoolExecutor(max_workers=RESULTS_WORKERS) as executor, yaspin(text="Fetching results", color="blue", quiet=self.quiet) as spinner:
+            slug = self.ctx["tournament_slug"]
+            pairings_futures = [executor.submit(self._get_json, pairings_path(slug, round)) for round in rounds]
+            ballots_futures: list[list[tuple[dict, Future[list[dict]]]]] = []
+            for round, pairings_future in zip(rounds, pairings_futures):
+                ballots_futures.append([(debate, executor.submit(self._get_json, ballots_path(slug, round, debate))) for debate in pairings_future.result()])
+            debates = 0
+            for round, round_futures in zip(rounds, ballots_futures):
+                results: list[DebateResult] = [parse_debate(debate, future.result()) for debate, future in round_futures]
+                debates += len(results)
+                if self.ctx["tournament_type"] is None:
+                    self.ctx["tournament_type"] = infer_tournament_type(results)
+                if self.ctx["tournament_type"] is not None:
+                    with profiling.span("aggregate_results", debates=len(results)):
+                        round_stats(round, results, self.ctx["tournament_type"])
+                    if self.ctx["tournament_type"] == "Asian":
+                        self._fill_asian_totals(round)
+                self._complete_round(round)
+            spinner.text = f"Fetched results of {debates} debates"
+            spinner.color = "green"
+            spinner.ok("✓")
+
+    def _get_json(self, path: str) -> list[dict]:
+        response = self._get(path)
+        with profiling.span("decode_json", bytes=len(response.content)):
+            return response.json()
+
+    @staticmethod
+    def _fill_asian_totals(round: Round):
+        # Fill missing (undisplayed) stats - rooms without any matches (may include vetoes, but stats are unknown)
+        total_rooms = 0
+        for round_motion in round["motions"]:
+            stat_balance = next((stat for stat in round_motion["stats"] if stat["type_"] == "Balance"), None)
+            if not stat_balance:
+                stat_balance = MotionStats(type_="Balance", value=[0, 0])
+                round_motion["stats"].insert(0, stat_balance)
+            total_rooms += stat_balance["value"][0] + stat_balance["value"][1]
+        for round_motion in round["motions"]:
+            assert round_motion["stats"][0]["type_"] == "Balance", "Expected Balance stat"
+            round_motion["stats"][0]["value"].append(total_rooms)
+            if len(round_motion["stats"]) == 2:
+                round_motion["stats"][1]["value"].append(total_rooms * 2)
+
+    def _complete_round(self, round: Round):
+        if round["url"] in self._completed:
+            return
+        self._completed.add(round["url"])
+        if self.on_round is not None:
+            self.on_round(round)
+
+    def _infer_tournament_type(self, row_element: "Tag") -> Literal["NA", "Asian", "BP"]:
         match len(row_element.select(":scope > *")):
             case 1:
                 match len(row_element.select(":scope > :first-child > *")):
@@ -122,7 +292,7 @@ class MotionManager:
         raise ValueError("Invalid row element")
     
     @staticmethod
-    def _extract_na_stats(row_element: Tag) -> list[MotionStats]:
+    def _extract_na_stats(row_element: "Tag") -> list[MotionStats]:
         aff_element = row_element.select_one("span.text-aff.pr-1.d-md-inline.d-block")
         neg_element = row_element.select_one("span.text-neg.pr-1.d-md-inline.d-block")
         assert aff_element, "Aff element not found"
@@ -130,57 +300,27 @@ class MotionManager:
         return [MotionStats(type_="Balance", value=[int(aff_element.get_text().strip().split(" ")[0]), int(neg_element.text.strip().split(" ")[0])])]
     
     @staticmethod
-    def _extract_asian_stats(row_element: Tag) -> list[MotionStats]:
+    def _extract_asian_stats(row_element: "Tag") -> list[MotionStats]:
         aff_wins = row_element.select_one(":scope > :first-child span.text-aff")
         neg_wins = row_element.select_one(":scope > :first-child span.text-neg")
         aff_vetoes = row_element.select_one(":scope > :last-child span.text-aff")
         neg_vetoes = row_element.select_one(":scope > :last-child span.text-neg")
         assert aff_wins, "Aff wins element not found"
         assert neg_wins, "Neg wins element not found"
-        def get_count(span_element: Tag|None) -> int:
+        def get_count(span_element: "Tag|None") -> int:
             return int(span_element.get_text().strip().split(" ")[0]) if span_element else 0
         return [MotionStats(type_="Balance", value=[get_count(aff_wins), get_count(neg_wins)]), MotionStats(type_="Veto", value=[get_count(aff_vetoes), get_count(neg_vetoes)])]
     
     @staticmethod
-    def _extract_bp_stats(row_element: Tag) -> list[MotionStats]:
+    def _extract_bp_stats(row_element: "Tag") -> list[MotionStats]:
         bench_bars = row_element.select(":scope > :first-child > :last-child > * > div.progress")
         assert len(bench_bars) == 4, "Expected 4 bench bars"
-        def get_count(rank_element: Tag) -> int:
+        def get_count(rank_element: "Tag") -> int:
             assert rank_element["title"], "Rank element data-original-title not found"
             return int(rank_element["title"].strip().split(" ")[0])
         return [MotionStats(type_=position, value=[get_count(rank_element) for rank_element in bench_bar.select(":scope > *")]) for position, bench_bar in zip(["OG", "OO", "CG", "CO"], bench_bars)]
     
     @staticmethod
     def _prettify_info(html: str) -> str:
-        soup = BeautifulSoup(html, "html.parser")
-
-        def handle_element(el, depth=0, in_list=False, list_type=None):
-            text_parts = []
-
-            for child in el.children:
-                if child.name is None:
-                    # It's a NavigableString
-                    text_parts.append(child.strip())
-                elif child.name == "br":
-                    text_parts.append("\n")
-                elif child.name == "p":
-                    p_text = handle_element(child, depth)
-                    if p_text.strip():
-                        text_parts.append(p_text.strip() + "\n")
-                elif child.name in ("ul", "ol"):
-                    for i, li in enumerate(child.find_all("li", recursive=False), start=1):
-                        bullet = f"{i}. " if child.name == "ol" else "- "
-                        li_text = handle_element(li, depth + 1, True, child.name)
-                        indent = "  " * depth
-                        text_parts.append(f"{indent}{bullet}{li_text.strip()}\n")
-                elif child.name == "li":
-                    li_text = handle_element(child, depth)
-                    text_parts.append(li_text.strip())
-                else:
-                    # Recurse for other tags
-                    text_parts.append(handle_element(child, depth))
-
-            return " ".join([t for t in text_parts if t]).strip().replace("\n ", "\n")
-
-        result = handle_element(soup)
-        return result.strip()
\ No newline at end of file
+        # Uncached; MotionManager converts through the shared InfoSlideConverter
+        return convert(html)
@@ -0,0 +1,45 @@
+from typing import TypedDict, Literal, TextIO
+import json
+import os
+import sys
+from .types import Round, RoundMotion, TournamentYear
+
+class RoundRecord(TypedDict):
+    type: Literal["round"]
+    tournament: str
+    seq: int
+    name: str
+    pretty_name: str
+    url: str
+    motions: list[RoundMotion]
+
+class TournamentRecord(TypedDict):
+    type: Literal["tournament"]
+    name: str
+    rounds: int
+    motions: int
+
+class NDJSONWriter:
+    # One JSON object per line, flushed as soon as it is written so readers can start on a round right away
+    stream: TextIO
+    tournament: str
+    def __init__(self, stream: TextIO, tournament: str):
+        self.stream = stream
+        self.tournament = tournament
+
+    def write_round(self, round: Round):
+        self._write(RoundRecord(type="round", tournament=self.tournament, seq=round["seq"], name=round["name"], pretty_name=round["pretty_name"], url=round["url"], motions=round["motions"]))
+
+    def write_tournament(self, tournament_year: TournamentYear):
+        # Last record of a tournament, once every round has been written
+        self._write(TournamentRecord(type="tournament", name=tournament_year["name"], rounds=len(tournament_year["rounds"]), motions=sum(len(round["motions"]) for round in tournament_year["rounds"])))
+
+    def _write(self, record: RoundRecord|TournamentRecord):
+        try:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.stream.flush()
+        except BrokenPipeError:
+            if self.stream is sys.stdout:
+                # The reader stopped reading, as `| head` does. Output left at exit goes to devnull instead of failing again
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            raise
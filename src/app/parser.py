@@ -0,0 +1,119 @@
+from typing import TYPE_CHECKING, Literal, Optional, Iterable, Iterator, Container
+from functools import cache
+from html import unescape
+from html.parser import HTMLParser
+from importlib.util import find_spec
+from . import profiling
+
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup, Tag
+
+ParserEngine = Literal["auto", "lxml", "html.parser"]
+ParserEngineList = ["auto", "lxml", "html.parser"]
+# Fastest first; html.parser is always available
+FALLBACK_ORDER = ["lxml", "html.parser"]
+
+_engine: ParserEngine = "auto"
+
+def configure(engine: ParserEngine):
+    if engine not in ParserEngineList:
+        raise ValueError(f"Invalid parser engine: {engine}")
+    global _engine
+    _engine = engine
+
+@cache
+def is_available(engine: str) -> bool:
+    return engine == "html.parser" or find_spec(engine) is not None
+
+def resolve_engine(engine: Optional[ParserEngine] = None) -> str:
+    engine = engine or _engine
+    if engine != "auto" and is_available(engine):
+        return engine
+    return next(candidate for candidate in FALLBACK_ORDER if is_available(candidate))
+
+def make_soup(html: str|bytes, engine: Optional[ParserEngine] = None) -> "BeautifulSoup":
+    # bs4 is loaded on the first parse rather than when the CLI starts
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, resolve_engine(engine))
+
+class RoundTileParser(HTMLParser):
+    # Cuts the raw markup of each `div.container-fluid > div > div.col > div.list-group.mt-3`
+    # out of a document fed in chunks, so only one round tile is held at a time.
+    # Each tile comes with the text of its round badge, so tiles can be skipped before they are parsed
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.tiles: list[tuple[str, str]] = []
+        self._div_classes: list[set[str]] = []
+        self._tile: Optional[list[str]] = None
+        self._tile_depth = 0
+        self._name: Optional[list[str]] = None
+        self._in_name = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        if tag == "div":
+            classes = set(dict(attrs).get("class", "").split()) # type: ignore
+            self._div_classes.append(classes)
+            if self._tile is None and self._is_round_tile():
+                self._tile = []
+                self._tile_depth = len(self._div_classes)
+                self._name = None
+        elif tag == "span" and self._tile is not None and self._name is None:
+            if {"badge", "badge-secondary"} <= set(dict(attrs).get("class", "").split()): # type: ignore
+                self._name = []
+                self._in_name = True
+        self._append(self.get_starttag_text())
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, Optional[str]]]):
+        self._append(self.get_starttag_text())
+
+    def handle_endtag(self, tag: str):
+        self._append(f"</{tag}>")
+        if tag == "span":
+            self._in_name = False
+        if tag == "div" and self._div_classes:
+            self._div_classes.pop()
+            if self._tile is not None and len(self._div_classes) < self._tile_depth:
+                self.tiles.append(("".join(self._tile), unescape("".join(self._name or []))))
+                self._tile = None
+
+    def handle_data(self, data: str):
+        self._append(data)
+        self._append_name(data)
+
+    def handle_entityref(self, name: str):
+        self._append(f"&{name};")
+        self._append_name(f"&{name};")
+
+    def handle_charref(self, name: str):
+        self._append(f"&#{name};")
+        self._append_name(f"&#{name};")
+
+    def handle_comment(self, data: str):
+        self._append(f"<!--{data}-->")
+
+    def _append(self, text: Optional[str]):
+        if self._tile is not None and text is not None:
+            self._tile.append(text)
+
+    def _append_name(self, text: str):
+        if self._in_name and self._name is not None:
+            self._name.append(text)
+
+    def _is_round_tile(self) -> bool:
+        stack = self._div_classes
+        return len(stack) >= 4 and {"list-group", "mt-3"} <= stack[-1] and "col" in stack[-2] and "container-fluid" in stack[-4]
+
+def iter_round_tiles(chunks: Iterable[str], engine: Optional[ParserEngine] = None, *, rounds: Optional[Container[str]] = None) -> Iterator["Tag"]:
+    # Only tiles of the given round names are parsed when rounds is set
+    tile_parser = RoundTileParser()
+    for chunk in chunks:
+        tile_parser.feed(chunk)
+        while tile_parser.tiles:
+            markup, name = tile_parser.tiles.pop(0)
+            if rounds is not None and name not in rounds:
+                continue
+            with profiling.span("parse_html", bytes=len(markup), stream=True):
+                tile = make_soup(markup, engine).select_one("div.list-group")
+            assert tile, "Round tile not found"
+            yield tile
+    tile_parser.close()
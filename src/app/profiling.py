@@ -0,0 +1,103 @@
+from typing import TypedDict, Optional, Any
+from pathlib import Path
+from datetime import datetime, timezone
+import json
+import threading
+import time
+
+class Span(TypedDict):
+    name: str
+    start: float
+    duration: float
+    thread: str
+    attrs: dict[str, Any]
+
+class PhaseSummary(TypedDict):
+    count: int
+    total: float
+    max: float
+
+class TimingReport(TypedDict):
+    started_at: str
+    duration: float
+    phases: dict[str, PhaseSummary]
+    spans: list[Span]
+
+class _Recorder:
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.origin = time.perf_counter()
+        self.spans: list[Span] = []
+        self.lock = threading.Lock()
+
+class _Span:
+    # Records itself on exit; attributes can be added while it is open
+    def __init__(self, recorder: _Recorder, name: str, attrs: dict[str, Any]):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self) -> dict[str, Any]:
+        self.start = time.perf_counter()
+        return self.attrs
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        span = Span(name=self.name, start=self.start - self.recorder.origin, duration=end - self.start, thread=threading.current_thread().name, attrs=self.attrs)
+        with self.recorder.lock:
+            self.recorder.spans.append(span)
+        return False
+
+class _NullSpan:
+    def __enter__(self) -> dict[str, Any]:
+        return {}
+
+    def __exit__(self, *args) -> bool:
+        return False
+
+_NULL_SPAN = _NullSpan()
+_recorder: Optional[_Recorder] = None
+
+def enable():
+    global _recorder
+    _recorder = _Recorder()
+
+def disable():
+    global _recorder
+    _recorder = None
+
+def is_enabled() -> bool:
+    return _recorder is not None
+
+def span(name: str, **attrs: Any) -> _Span|_NullSpan:
+    # Costs one check when recording is off
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return _Span(recorder, name, attrs)
+
+def report() -> TimingReport:
+    recorder = _recorder
+    assert recorder is not None, "Timings are not being recorded"
+    with recorder.lock:
+        spans = sorted(recorder.spans, key=lambda span: span["start"])
+    phases: dict[str, PhaseSummary] = {}
+    for span in spans:
+        phase = phases.setdefault(span["name"], PhaseSummary(count=0, total=0.0, max=0.0))
+        phase["count"] += 1
+        phase["total"] += span["duration"]
+        phase["max"] = max(phase["max"], span["duration"])
+    return TimingReport(started_at=recorder.started_at.isoformat(), duration=time.perf_counter() - recorder.origin, phases=phases, spans=spans)
+
+def write_report(path: Path, timing_report: TimingReport):
+    path.write_text(json.dumps(timing_report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+def format_summary(timing_report: TimingReport) -> list[str]:
+    # Phases from different threads overlap, so their totals can add up to more than the run
+    lines = [f"{'phase':<24} {'count':>7} {'total':>11} {'max':>11}"]
+    for name, phase in sorted(timing_report["phases"].items(), key=lambda item: -item[1]["total"]):
+        lines.append(f"{name:<24} {phase['count']:>7} {phase['total'] * 1000:>8.1f} ms {phase['max'] * 1000:>8.1f} ms")
+    lines.append(f"{'run':<24} {'':>7} {timing_report['duration'] * 1000:>8.1f} ms")
+    return lines
@@ -1,31 +1,77 @@
+from typing import Iterator
 from pathlib import Path
+import mmap
+import pickle
 import re
 from .types import TournamentGroup, TournamentYear, Round, RoundMotion
-from .utils import tournament_year_to_lines
+from .utils import tournament_year_to_lines, atomic_write_text
 
 class MotionFileReader:
     def __init__(self, path: Path):
         self.path = path
-        self.lines = self.path.read_text().split("\n")
-    
+        # Original lines of each parsed group header and tournament, keyed by id() of the parsed object.
+        # Tournaments whose snapshot still matches are written back verbatim
+        self._headers: dict[int, tuple[TournamentGroup, str, list[str]]] = {}
+        self._spans: dict[int, tuple[TournamentYear, bytes, list[str]]] = {}
+        self._prologue: list[str] = []
+        self._epilogue: list[str] = []
+
+    def iter_lines(self) -> Iterator[str]:
+        # Lines are decoded one at a time from a memory map instead of reading the whole file.
+        # \r\n and \r end lines as with universal newlines, and files are always written back with \n
+        with open(self.path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # Empty file
+                return
+            with mm:
+                for line in iter(mm.readline, b""):
+                    text = line.decode("utf-8").removesuffix("\n").removesuffix("\r")
+                    if "\r" in text:
+                        yield from text.split("\r")
+                    else:
+                        yield text
+                if mm[-1:] in (b"\n", b"\r"):
+                    yield ""
+
     def get_tournament_groups(self) -> list[TournamentGroup]:
-        res: list[TournamentGroup] = []
+        return list(self.iter_tournament_groups(track=True))
+
+    def iter_tournament_groups(self, *, track: bool = False) -> Iterator[TournamentGroup]:
         tournament_group: TournamentGroup|None = None
         tournament_year: TournamentYear|None = None
         round: Round|None = None
         round_motion: RoundMotion|None = None
+        tracked_year: TournamentYear|None = None
+        # Tournament years the current round and motion belong to, which malformed lines can attach to from a later span
+        round_year: TournamentYear|None = None
+        motion_year: TournamentYear|None = None
+        span: list[str] = []
+        if track:
+            self._headers.clear()
+            self._spans.clear()
+            self._prologue, self._epilogue = span, []
         
-        for line in self.lines:
+        for line in self.iter_lines():
             indent_level, content = self._extract_line(line)
+            if track:
+                if content and indent_level <= 1:
+                    self._close_span(tracked_year)
+                    tracked_year = None
+                    span = []
+                span.append(line)
             if not content:
                 continue
             match indent_level:
                 case 0:
+                    if tournament_group is not None:
+                        yield tournament_group
                     tournament_group = {
                         "name": content,
                         "tournaments": []
                     }
-                    res.append(tournament_group)
+                    if track:
+                        self._headers[id(tournament_group)] = (tournament_group, content, span)
                 case 1:
                     assert tournament_group, "Tournament group not found"
                     tournament_year = {
@@ -33,6 +79,9 @@ class MotionFileReader:
                         "rounds": []
                     }
                     tournament_group["tournaments"].append(tournament_year)
+                    if track:
+                        tracked_year = tournament_year
+                        self._spans[id(tournament_year)] = (tournament_year, b"", span)
                 case 2:
                     assert tournament_year, "Tournament year not found"
                     round = {
@@ -43,6 +92,7 @@ class MotionFileReader:
                         "pretty_name": content
                     }
                     tournament_year["rounds"].append(round)
+                    round_year = tournament_year
                 case 3:
                     assert round, "Round not found"
                     round_motion = {
@@ -57,6 +107,7 @@ class MotionFileReader:
                         "stats": []
                     }
                     round["motions"].append(round_motion)
+                    motion_year = round_year
                 case 4:
                     assert round_motion, "Round motion not found"
                     if "$stats" in content:
@@ -73,33 +124,83 @@ class MotionFileReader:
                         round_motion["motion"]["info_slide_plain"] += ("\n" if round_motion["motion"]["info_slide_plain"] else "") + content
                 case _:
                     raise ValueError(f"Invalid indent level: {indent_level}")
-        return res
+            if track and indent_level >= 2:
+                owner = tournament_year if indent_level == 2 else round_year if indent_level == 3 else motion_year
+                if owner is not tracked_year:
+                    # An orphan line right after a header attaches to an earlier tournament, so it leaves the span it
+                    # was read in and that tournament is written again with it
+                    span.pop()
+                    assert owner is not None, "Tournament year not found"
+                    self._spans[id(owner)] = (owner, b"", self._spans[id(owner)][2])
+        if track:
+            self._close_span(tracked_year)
+            # Trailing blank lines stay at the end of the file whatever gets inserted
+            while span and not span[-1].strip():
+                self._epilogue.insert(0, span.pop())
+        if tournament_group is not None:
+            yield tournament_group
     
     def tournament_groups_to_lines(self, tournament_groups: list[TournamentGroup]) -> list[str]:
-        lines: list[str] = []
+        lines: list[str] = list(self._prologue)
         for tg in tournament_groups:
-            lines.append(f"{tg['name']}")
+            header = self._headers.get(id(tg))
+            if header is not None and header[0] is tg and header[1] == tg["name"]:
+                lines.extend(header[2])
+            else:
+                lines.append(f"{tg['name']}")
             for ty in tg["tournaments"]:
-                lines.extend(tournament_year_to_lines(ty))
+                span = self._spans.get(id(ty))
+                if span is not None and span[0] is ty and span[1] == self._snapshot(ty):
+                    lines.extend(span[2])
+                else:
+                    lines.extend(tournament_year_to_lines(ty))
+        lines.extend(self._epilogue)
         return lines
     
     def write_to_file(self, lines: list[str]):
-        self.path.write_text("\n".join(lines))
+        atomic_write_text(self.path, "\n".join(lines))
+
+    def _close_span(self, tournament_year: TournamentYear|None):
+        if tournament_year is not None:
+            _, _, span = self._spans[id(tournament_year)]
+            self._spans[id(tournament_year)] = (tournament_year, self._snapshot(tournament_year), span)
     
+    @staticmethod
+    def _snapshot(tournament_year: TournamentYear) -> bytes:
+        # Cheaper than JSON; equal bytes always mean equal data
+        return pickle.dumps(tournament_year, pickle.HIGHEST_PROTOCOL)
+
     @staticmethod
     def _extract_line(line: str) -> tuple[int, str]:
-        indent = re.match(r"^(?:\s{4}|\t)*", line).group() # type: ignore
         content = line.strip()
-        indent_level = MotionFileReader._resolve_indent(indent)
-        return indent_level, content
-    
+        if not content:
+            return 0, content
+        # Common case: tabs followed by content
+        stripped = line.lstrip("\t")
+        if not stripped[0].isspace():
+            return len(line) - len(stripped), content
+        return MotionFileReader._resolve_indent(line), content
+
     @staticmethod
-    def _resolve_indent(indent_str: str) -> int:
-        def _iter(indent_str: str) -> int:
-            if not indent_str:
-                return 0
-            if indent_str[0] == "\t":
-                return 1 + _iter(indent_str[1:])
-            assert indent_str.startswith("    "), "Invalid indent string"
-            return 4 + _iter(indent_str[4:])
-        return _iter(indent_str)
\ No newline at end of file
+    def _resolve_indent(line: str) -> int:
+        # Indent as matched by ^(?:\s{4}|\t)*, where a tab counts 1 and four spaces count 4
+        end = 0
+        while True:
+            chunk = line[end:end+4]
+            if len(chunk) == 4 and chunk.isspace():
+                end += 4
+            elif line.startswith("\t", end):
+                end += 1
+            else:
+                break
+        indent_level = 0
+        i = 0
+        while i < end:
+            if line[i] == "\t":
+                indent_level += 1
+                i += 1
+            else:
+                assert i + 4 <= end and line.startswith("    ", i), "Invalid indent string"
+                indent_level += 4
+                i += 4
+        return indent_level
@@ -0,0 +1,55 @@
+from typing import TypedDict
+from .interface.types import TabbycatContext
+from .types import MotionStats, RoundMotion, TournamentSource, TournamentYear
+from .utils import parse_round, parse_motion
+
+class StatsChange(TypedDict):
+    round: str
+    motion: str
+    before: list[MotionStats]
+    after: list[MotionStats]
+    target: RoundMotion
+
+class StatsDiff(TypedDict):
+    changes: list[StatsChange]
+    # Fetched motions with no counterpart in the motions file
+    missing: int
+    # Fetched motions without stats, e.g. when the statistics page was hidden; their stored stats are kept
+    without_stats: int
+
+def source_context(source: TournamentSource) -> TabbycatContext:
+    # The recorded name is used so the fetched tournament keeps the name it has in the motions file
+    return TabbycatContext(base_url=source["url"], tournament_slug=source["slug"], tournament_name=source["name"], tournament_type=source.get("type"))
+
+def diff_stats(existing: TournamentYear, fetched: TournamentYear) -> StatsDiff:
+    # Motions are matched by round and text as written to the file; repeated texts are matched in order
+    round_motions: dict[tuple[str, str], list[RoundMotion]] = {}
+    for round in existing["rounds"]:
+        for round_motion in round["motions"]:
+            round_motions.setdefault((round["name"], round_motion["motion"]["text"]), []).append(round_motion)
+    changes: list[StatsChange] = []
+    missing = 0
+    without_stats = 0
+    for round in fetched["rounds"]:
+        round_name = parse_round(round["pretty_name"]).strip()
+        for round_motion in round["motions"]:
+            text = parse_motion(round_motion["motion"]["text"]).strip()
+            candidates = round_motions.get((round_name, text))
+            if not candidates:
+                missing += 1
+                continue
+            target = candidates.pop(0)
+            if not round_motion["stats"]:
+                # Never replaces stored stats with nothing
+                without_stats += 1
+                continue
+            if target["stats"] != round_motion["stats"]:
+                changes.append(StatsChange(round=round_name, motion=text, before=target["stats"], after=round_motion["stats"], target=target))
+    return StatsDiff(changes=changes, missing=missing, without_stats=without_stats)
+
+def apply_stats(diff: StatsDiff):
+    for change in diff["changes"]:
+        change["target"]["stats"] = change["after"]
+
+def format_stats(stats: list[MotionStats]) -> str:
+    return "; ".join(f"{stat['type_']} {', '.join(str(value) for value in stat['value'])}" for stat in stats) or "none"
@@ -0,0 +1,215 @@
+from typing import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import os
+import re
+try:
+    import fcntl
+except ImportError: # Windows, where repositories aren't locked
+    fcntl = None
+from .types import TournamentData, TournamentGroup, TournamentYear, TournamentSource
+from .reader import MotionFileReader
+from .utils import stage_text, sync_directory
+from . import profiling
+
+TOURNAMENT_LIST_PATH = Path("Javascript")/"TournamentList.json"
+JOURNAL_NAME = ".automotions-journal.json"
+# Name of a file staged by stage_text: the target's name after a dot, and the random suffix of tempfile
+STAGED_NAME = re.compile(r"\.(.+)\.[a-z0-9_]{8}")
+
+class MotionsRepository:
+    path: Path
+    def __init__(self, path: Path):
+        self.path = path
+        self.recover()
+
+    @property
+    def tournament_list_file(self) -> Path:
+        return self.path/TOURNAMENT_LIST_PATH
+
+    @property
+    def journal_file(self) -> Path:
+        return self.path/JOURNAL_NAME
+
+    @contextmanager
+    def transaction(self) -> Iterator["RepositoryTransaction"]:
+        # Nothing is written unless the whole block succeeds
+        transaction = RepositoryTransaction(self)
+        yield transaction
+        transaction.commit()
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        # Held by a commit from staging its files until its journal is removed, and while recovering, so no process
+        # recovers or deletes the files of a commit that is still in flight. The lock goes away with the process
+        if fcntl is None:
+            yield
+            return
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def recover(self):
+        with self.lock():
+            self.replay_journal()
+            self._remove_staged_files()
+
+    def replay_journal(self):
+        # Finishes the renames of a commit that was interrupted after its journal was written; the lock must be held
+        try:
+            staged: list[tuple[str, str]] = json.loads(self.journal_file.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except ValueError:
+            # The journal itself was cut off, so no file has been replaced yet
+            self.journal_file.unlink()
+            sync_directory(self.path)
+            return
+        for temp, target in staged:
+            if (self.path/temp).exists():
+                os.replace(self.path/temp, self.path/target)
+        for directory in {(self.path/target).parent for _, target in staged}:
+            sync_directory(directory)
+        self.journal_file.unlink()
+        sync_directory(self.path)
+
+    def _remove_staged_files(self):
+        # Files staged by a commit that was interrupted before its journal was complete; every file the journal
+        # lists has been renamed by now, so any staged file left is an orphan
+        targets = [self.journal_file, self.tournament_list_file]
+        try:
+            targets += [self.path/tournament["url"] for tournament in json.loads(self.tournament_list_file.read_text())]
+        except (FileNotFoundError, ValueError):
+            pass
+        names: dict[Path, set[str]] = {}
+        for target in targets:
+            names.setdefault(target.parent, set()).add(target.name)
+        # Each directory is listed once, however many motions files it holds
+        for directory, target_names in names.items():
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                match = STAGED_NAME.fullmatch(entry.name)
+                if match is not None and match[1] in target_names and entry.is_file(follow_symlinks=False):
+                    os.unlink(entry.path)
+
+class RepositoryTransaction:
+    repository: MotionsRepository
+    tournament_list: list[TournamentData]
+    def __init__(self, repository: MotionsRepository):
+        self.repository = repository
+        self.tournament_list = json.loads(repository.tournament_list_file.read_text())
+        self._readers: dict[str, MotionFileReader] = {}
+        self._tournament_groups: dict[str, list[TournamentGroup]] = {}
+        self._dirty: list[str] = []
+        self._list_dirty = False
+
+    def get_tournament(self, id: str) -> TournamentData:
+        tournament = next((t for t in self.tournament_list if t["id"] == id), None)
+        assert tournament is not None, f"Tournament {id} not found"
+        return tournament
+
+    def update_latest(self, id: str, latest: int) -> TournamentData:
+        tournament = self.get_tournament(id)
+        if tournament["latest"] != latest:
+            tournament["latest"] = latest
+            self._list_dirty = True
+        return tournament
+
+    def record_source(self, id: str, source: TournamentSource) -> TournamentData:
+        # One source per tournament year; importing the same year again replaces it
+        tournament = self.get_tournament(id)
+        sources = tournament.setdefault("sources", [])
+        i = next((i for i, s in enumerate(sources) if s["name"] == source["name"]), None)
+        if i is None:
+            sources.append(source)
+        elif sources[i] != source:
+            sources[i] = source
+        else:
+            return tournament
+        self._list_dirty = True
+        return tournament
+
+    def find_tournament_year(self, url: str, name: str) -> tuple[int, int]|None:
+        # Position of the first tournament year with the given name in a file
+        for i, tournament_group in enumerate(self.get_tournament_groups(url)):
+            for j, tournament_year in enumerate(tournament_group["tournaments"]):
+                if tournament_year["name"] == name:
+                    return i, j
+        return None
+
+    def create_tournament(self, tournament: TournamentData):
+        assert all(t["id"] != tournament["id"] for t in self.tournament_list), "Tournament ID already exists"
+        assert tournament["url"] not in self._tournament_groups and not (self.repository.path/tournament["url"]).exists(), f"Tournament file {tournament['url']} already exists"
+        self.tournament_list.append(tournament)
+        self._list_dirty = True
+        self._readers[tournament["url"]] = MotionFileReader(self.repository.path/tournament["url"])
+        self._tournament_groups[tournament["url"]] = [{"name": tournament["name"], "tournaments": []}]
+        self._mark_dirty(tournament["url"])
+
+    def get_tournament_groups(self, url: str) -> list[TournamentGroup]:
+        # Each file is parsed once however many tournaments are inserted into it
+        if url not in self._tournament_groups:
+            reader = self._readers[url] = MotionFileReader(self.repository.path/url)
+            self._tournament_groups[url] = reader.get_tournament_groups()
+        return self._tournament_groups[url]
+
+    def insert(self, url: str, position: tuple[int, int], tournament_year: TournamentYear):
+        self.get_tournament_groups(url)[position[0]]["tournaments"].insert(position[1], tournament_year)
+        self._mark_dirty(url)
+
+    def replace(self, url: str, position: tuple[int, int], tournament_year: TournamentYear) -> bool:
+        # Replaces the tournament at the position if it has the same name; other tournaments are written back verbatim
+        tournaments = self.get_tournament_groups(url)[position[0]]["tournaments"]
+        if position[1] >= len(tournaments) or tournaments[position[1]]["name"] != tournament_year["name"]:
+            return False
+        tournaments[position[1]] = tournament_year
+        self._mark_dirty(url)
+        return True
+
+    def commit(self):
+        if not self._dirty and not self._list_dirty:
+            return
+        path = self.repository.path
+        with self.repository.lock():
+            # A commit that crashed since the repository was opened is finished first, so its journal isn't overwritten
+            self.repository.replay_journal()
+            staged: list[tuple[Path, Path]] = []
+            try:
+                for url in self._dirty:
+                    reader = self._readers[url]
+                    text = "\n".join(reader.tournament_groups_to_lines(self._tournament_groups[url]))
+                    with profiling.span("write_file", path=url, bytes=len(text)):
+                        staged.append((stage_text(reader.path, text), reader.path))
+                # The tournament list goes last so it never points at a file that hasn't been written
+                list_file = self.repository.tournament_list_file
+                text = json.dumps(self.tournament_list, indent=4)
+                with profiling.span("write_file", path=str(TOURNAMENT_LIST_PATH), bytes=len(text)):
+                    staged.append((stage_text(list_file, text), list_file))
+                journal = [(str(temp.relative_to(path)), str(target.relative_to(path))) for temp, target in staged]
+                os.replace(stage_text(self.repository.journal_file, json.dumps(journal)), self.repository.journal_file)
+                # The journal is on disk before any file is replaced
+                sync_directory(path)
+            except BaseException:
+                for temp, _ in staged:
+                    temp.unlink(missing_ok=True)
+                raise
+            with profiling.span("replace_files", files=len(staged)):
+                for temp, target in staged:
+                    os.replace(temp, target)
+                for directory in {target.parent for _, target in staged}:
+                    sync_directory(directory)
+                self.repository.journal_file.unlink()
+                sync_directory(path)
+        self._dirty.clear()
+        self._list_dirty = False
+
+    def _mark_dirty(self, url: str):
+        if url not in self._dirty:
+            self._dirty.append(url)
@@ -0,0 +1,66 @@
+from typing import Optional
+from pathlib import Path
+from .matcher import normalize_text
+from .search import SearchIndex, SearchResult
+from .types import TournamentYear
+from .utils import parse_motion
+from . import profiling
+
+DEFAULT_THRESHOLD = 0.7
+SHINGLE_SIZE = 5
+# Candidates from the search index compared exactly with each fetched motion
+CANDIDATES = 50
+
+def shingles(text: str) -> frozenset[str]:
+    # Character 5-grams of the normalized motion, padded like MotionSimilarity's so both give the same similarity
+    text = normalize_text(parse_motion(text))
+    padded = text + "\0" * (SHINGLE_SIZE - 1)
+    return frozenset(padded[i:i+SHINGLE_SIZE] for i in range(len(text)))
+
+class ReusedMotions:
+    # Checks fetched motions against the persistent search index, so a run only re-reads the files changed since the last
+    # one and needs neither numpy nor every motion of the repository in memory
+    index: SearchIndex
+    threshold: float
+    exclude_tournament: Optional[str]
+    def __init__(self, repository_path: Path, *, threshold: float = DEFAULT_THRESHOLD, exclude_tournament: Optional[str] = None):
+        self.index = SearchIndex(repository_path)
+        self.threshold = threshold
+        self.exclude_tournament = exclude_tournament
+        with profiling.span("update_index"):
+            self.index.update()
+
+    def __enter__(self) -> "ReusedMotions":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.index.close()
+
+    def query(self, text: str) -> list[tuple[SearchResult, float]]:
+        query = shingles(text)
+        if not query:
+            return []
+        matches: list[tuple[SearchResult, float]] = []
+        for candidate in self.index.similar_motions(normalize_text(parse_motion(text)), limit=CANDIDATES, exclude_tournament=self.exclude_tournament):
+            candidate_shingles = shingles(candidate["motion"])
+            score = len(query & candidate_shingles) / len(query | candidate_shingles) if candidate_shingles else 0.0
+            if score >= self.threshold:
+                matches.append((candidate, score))
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+def describe_reused_motions(reused: ReusedMotions, tournament_year: TournamentYear) -> list[str]:
+    warnings: list[str] = []
+    for round in tournament_year["rounds"]:
+        for round_motion in round["motions"]:
+            with profiling.span("check_duplicates"):
+                matches = reused.query(round_motion["motion"]["text"])
+            if not matches:
+                continue
+            match, score = matches[0]
+            others = f" and {len(matches) - 1} more" if len(matches) > 1 else ""
+            warnings.append(f"⚠ {round['pretty_name']}: motion already exists in {match['tournament_id']}: {match['tournament']} / {match['round']} ({score:.0%} similar){others}")
+    return warnings
@@ -0,0 +1,228 @@
+from typing import TypedDict, Optional, Iterator
+from pathlib import Path
+import hashlib
+import json
+import re
+import sqlite3
+from .cache import default_cache_dir
+from .reader import MotionFileReader
+from .repository import TOURNAMENT_LIST_PATH
+from .types import TournamentData
+
+SCHEMA_VERSION = 1
+MIN_TRIGRAM_TERM = 3
+# Rarest terms of a motion that are looked up to find motions similar to it: at least the minimum, then more while
+# the motions containing them stay within the budget
+SIMILAR_TERMS = (4, 16)
+SIMILAR_BUDGET = 2000
+# Relative weights of group, tournament, round, motion, info and stats columns
+RANK_WEIGHTS = (1.0, 2.0, 1.0, 5.0, 1.0, 0.5)
+ENTRY_COLUMNS = "e.file, e.tournament_id, e.group_name AS 'group', e.tournament, e.round, e.motion, e.info, e.stats"
+
+class SearchResult(TypedDict):
+    file: str
+    tournament_id: str
+    group: str
+    tournament: str
+    round: str
+    motion: str
+    info: str
+    stats: str
+    rank: float
+
+class IndexStats(TypedDict):
+    indexed: int
+    unchanged: int
+    removed: int
+    failed: list[str]
+
+def default_index_path(repository_path: Path) -> Path:
+    key = hashlib.sha256(str(repository_path.resolve()).encode()).hexdigest()[:16]
+    return default_cache_dir()/"index"/f"{key}.sqlite3"
+
+class SearchIndex:
+    repository_path: Path
+    index_path: Path
+    def __init__(self, repository_path: Path, index_path: Optional[Path] = None):
+        self.repository_path = repository_path
+        self.index_path = index_path or default_index_path(repository_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.index_path)
+        self._connection.row_factory = sqlite3.Row
+        self.trigram = self._migrate()
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def update(self) -> IndexStats:
+        # Files are re-read only when their size or mtime changed, and re-indexed only when their content did
+        tournament_list: list[TournamentData] = json.loads((self.repository_path/TOURNAMENT_LIST_PATH).read_text())
+        tournament_ids: dict[str, str] = {}
+        for tournament in tournament_list:
+            tournament_ids.setdefault(tournament["url"], tournament["id"])
+        known = {row["path"]: row for row in self._connection.execute("SELECT path, mtime_ns, size, hash FROM files")}
+        stats = IndexStats(indexed=0, unchanged=0, removed=0, failed=[])
+        with self._connection:
+            for url, tournament_id in tournament_ids.items():
+                path = self.repository_path/url
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                row = known.get(url)
+                if row is not None and row["mtime_ns"] == stat.st_mtime_ns and row["size"] == stat.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+                if row is None or row["hash"] != digest:
+                    self._connection.execute("DELETE FROM entries WHERE file = ?", (url,))
+                    try:
+                        self._connection.executemany(
+                            "INSERT INTO entries (file, tournament_id, group_name, tournament, round, motion, info, stats) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                            self._iter_rows(path, url, tournament_id),
+                        )
+                        stats["indexed"] += 1
+                    except (AssertionError, ValueError) as e:
+                        # Kept as indexed so a broken file isn't parsed again until it changes
+                        self._connection.execute("DELETE FROM entries WHERE file = ?", (url,))
+                        stats["failed"].append(f"{url}: {e}")
+                else:
+                    stats["unchanged"] += 1
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+                    (url, stat.st_mtime_ns, stat.st_size, digest),
+                )
+            for url in known.keys() - tournament_ids.keys():
+                self._connection.execute("DELETE FROM entries WHERE file = ?", (url,))
+                self._connection.execute("DELETE FROM files WHERE path = ?", (url,))
+                stats["removed"] += 1
+        return stats
+
+    def search(self, query: str, *, limit: int = 20, raw: bool = False) -> list[SearchResult]:
+        # Terms must all appear; `raw` passes the query through as FTS5 syntax
+        match, terms = (query, []) if raw else self._build_query(query)
+        filters = " AND ".join("instr(lower(e.group_name || ' ' || e.tournament || ' ' || e.round || ' ' || e.motion || ' ' || e.info || ' ' || e.stats), ?) > 0" for _ in terms)
+        if match:
+            # Ranked inside the full-text index first, so rows are only read for results that can be returned
+            sql = f"SELECT rowid, rank FROM entries_fts WHERE entries_fts MATCH ? ORDER BY rank"
+            if not filters:
+                sql += " LIMIT ?"
+            sql = f"SELECT {ENTRY_COLUMNS}, m.rank FROM ({sql}) m JOIN entries e ON e.id = m.rowid"
+            if filters:
+                sql += f" WHERE {filters} ORDER BY m.rank LIMIT ?"
+            else:
+                sql += " ORDER BY m.rank"
+            params = [match, *terms, limit]
+        elif terms:
+            sql = f"SELECT {ENTRY_COLUMNS}, 0.0 AS rank FROM entries e WHERE {filters} ORDER BY e.id LIMIT ?"
+            params = [*terms, limit]
+        else:
+            return []
+        return [SearchResult(**row) for row in self._connection.execute(sql, params)] # type: ignore
+
+    def similar_motions(self, text: str, *, limit: int = 20, exclude_tournament: Optional[str] = None) -> list[SearchResult]:
+        # Candidates for motions similar to the text, which should already be normalized: motions sharing the most of its
+        # rarest trigrams (words without the trigram tokenizer). A near-duplicate shares most of them, and rare terms
+        # keep the lookup to a few short posting lists
+        terms = sorted({text[i:i+MIN_TRIGRAM_TERM] for i in range(len(text) - MIN_TRIGRAM_TERM + 1)} if self.trigram else set(re.findall(r"\w+", text)))
+        if not terms:
+            return []
+        self._connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.entries_vocab USING fts5vocab(main, 'entries_fts', 'col')")
+        counts: dict[str, int] = dict(self._connection.execute(f"SELECT term, doc FROM entries_vocab WHERE col = 'motion' AND term IN ({', '.join('?' * len(terms))})", terms).fetchall())
+        terms = [term for term in terms if term in counts]
+        if not terms:
+            return []
+        terms.sort(key=lambda term: counts[term])
+        selected: list[str] = []
+        total = 0
+        for term in terms[:SIMILAR_TERMS[1]]:
+            total += counts[term]
+            if len(selected) >= SIMILAR_TERMS[0] and total > SIMILAR_BUDGET:
+                break
+            selected.append(term)
+        match = "motion : (" + " OR ".join('"' + term.replace('"', '""') + '"' for term in selected) + ")"
+        sql = f"SELECT {ENTRY_COLUMNS}, m.rank FROM (SELECT rowid, rank FROM entries_fts WHERE entries_fts MATCH ? ORDER BY rank) m JOIN entries e ON e.id = m.rowid"
+        params: list = [match]
+        if exclude_tournament is not None:
+            sql += " WHERE e.tournament != ?"
+            params.append(exclude_tournament)
+        sql += " ORDER BY m.rank LIMIT ?"
+        params.append(limit)
+        return [SearchResult(**row) for row in self._connection.execute(sql, params)] # type: ignore
+
+    def iter_entries(self) -> Iterator[SearchResult]:
+        for row in self._connection.execute(f"SELECT {ENTRY_COLUMNS}, 0.0 AS rank FROM entries e ORDER BY e.id"):
+            yield SearchResult(**row) # type: ignore
+
+    def _build_query(self, query: str) -> tuple[str, list[str]]:
+        # The trigram tokenizer can't match terms shorter than 3 characters, so those are filtered separately
+        phrases: list[str] = []
+        terms: list[str] = []
+        for term in query.split():
+            if self.trigram and len(term) < MIN_TRIGRAM_TERM:
+                terms.append(term.lower())
+            else:
+                phrases.append('"' + term.replace('"', '""') + '"')
+        return " ".join(phrases), terms
+
+    @staticmethod
+    def _iter_rows(path: Path, url: str, tournament_id: str) -> Iterator[tuple[str, str, str, str, str, str, str, str]]:
+        for tournament_group in MotionFileReader(path).iter_tournament_groups():
+            for tournament_year in tournament_group["tournaments"]:
+                for round in tournament_year["rounds"]:
+                    for round_motion in round["motions"]:
+                        yield (
+                            url,
+                            tournament_id,
+                            tournament_group["name"],
+                            tournament_year["name"],
+                            round["name"],
+                            round_motion["motion"]["text"],
+                            round_motion["motion"]["info_slide_plain"],
+                            "\n".join(f"{stats['type_']} {', '.join(str(value) for value in stats['value'])}" for stats in round_motion["stats"]),
+                        )
+
+    def _migrate(self) -> bool:
+        version: int = self._connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            with self._connection:
+                self._connection.executescript("""
+                    DROP TABLE IF EXISTS entries_fts;
+                    DROP TABLE IF EXISTS entries;
+                    DROP TABLE IF EXISTS files;
+                    CREATE TABLE files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, hash TEXT);
+                    CREATE TABLE entries (
+                        id INTEGER PRIMARY KEY,
+                        file TEXT, tournament_id TEXT, group_name TEXT, tournament TEXT, round TEXT, motion TEXT, info TEXT, stats TEXT
+                    );
+                    CREATE INDEX entries_file ON entries (file);
+                """)
+                # Trigrams match inside Japanese text, which has no spaces between words
+                try:
+                    self._create_fts("trigram")
+                except sqlite3.OperationalError:
+                    self._create_fts("unicode61")
+                self._connection.execute(f"INSERT INTO entries_fts (entries_fts, rank) VALUES ('rank', 'bm25({', '.join(map(str, RANK_WEIGHTS))})')")
+                self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        sql: str = self._connection.execute("SELECT sql FROM sqlite_master WHERE name = 'entries_fts'").fetchone()[0]
+        return "trigram" in sql
+
+    def _create_fts(self, tokenizer: str):
+        columns = "group_name, tournament, round, motion, info, stats"
+        old_columns = ", ".join(f"old.{column}" for column in columns.split(", "))
+        new_columns = ", ".join(f"new.{column}" for column in columns.split(", "))
+        self._connection.executescript(f"""
+            CREATE VIRTUAL TABLE entries_fts USING fts5({columns}, content='entries', content_rowid='id', tokenize='{tokenizer}');
+            CREATE TRIGGER entries_ai AFTER INSERT ON entries BEGIN
+                INSERT INTO entries_fts (rowid, {columns}) VALUES (new.id, {new_columns});
+            END;
+            CREATE TRIGGER entries_ad AFTER DELETE ON entries BEGIN
+                INSERT INTO entries_fts (entries_fts, rowid, {columns}) VALUES ('delete', old.id, {old_columns});
+            END;
+        """)
@@ -0,0 +1,111 @@
+from typing import Optional
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+from .cache import ResponseCache, CacheMissError, CACHE_STATUS_HEADER
+from . import profiling
+
+DEFAULT_TIMEOUT: tuple[float, float] = (5.0, 30.0) # (connect, read) seconds
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 16
+RETRY_STATUS = (429, 500, 502, 503, 504)
+USER_AGENT = "automotions/0.1.0"
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_timeout: tuple[float, float] = DEFAULT_TIMEOUT
+_retries: int = DEFAULT_RETRIES
+_backoff: float = DEFAULT_BACKOFF
+_pool_size: int = DEFAULT_POOL_SIZE
+_cache: Optional[ResponseCache] = None
+# Tabbycat API token and the only host it is sent to
+_token: Optional[tuple[str, str]] = None
+_UNSET = object()
+
+def configure(*, timeout: Optional[float|tuple[float, float]] = None, retries: Optional[int] = None, backoff: Optional[float] = None, pool_size: Optional[int] = None, cache: Optional[ResponseCache]|object = _UNSET, token: Optional[tuple[str, str]] = None):
+    global _session, _timeout, _retries, _backoff, _pool_size, _cache, _token
+    with _lock:
+        if token is not None:
+            _token = (token[0].lower(), token[1])
+        if cache is not _UNSET:
+            _cache = cache # type: ignore
+        if timeout is not None:
+            _timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        if retries is not None:
+            _retries = retries
+        if backoff is not None:
+            _backoff = backoff
+        if pool_size is not None:
+            _pool_size = pool_size
+        # Recreate the session with the new settings on next use
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def get_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = _create_session()
+        return _session
+
+def get(url: str, **kwargs) -> requests.Response:
+    with profiling.span("http", url=url) as attrs:
+        response = _get(url, **kwargs)
+        attrs["status"] = response.status_code
+        attrs["cache"] = response.headers.get(CACHE_STATUS_HEADER, "off")
+        # A streamed body hasn't been read yet, so only its declared size is known
+        attrs["bytes"] = int(response.headers.get("Content-Length", 0)) if kwargs.get("stream") else len(response.content)
+        return response
+
+def _get(url: str, **kwargs) -> requests.Response:
+    kwargs.setdefault("timeout", _timeout)
+    token = _token
+    if token is not None and (urlsplit(url).hostname or "").lower() == token[0] and urlsplit(url).path.startswith("/api/"):
+        # Tabbycat's token authentication, for API data the tournament doesn't make public.
+        # These responses bypass the cache, so later runs without the token can't read them
+        if _cache is not None and _cache.offline:
+            raise CacheMissError(f"{url} is requested with the API token, so it is never cached (offline mode)")
+        kwargs["headers"] = {**kwargs.get("headers", {}), "Authorization": f"Token {token[1]}"}
+        return get_session().get(url, **kwargs)
+    cache = _cache
+    if cache is None:
+        return get_session().get(url, **kwargs)
+    stream: bool = kwargs.pop("stream", False)
+    entry = cache.lookup(url)
+    if cache.offline:
+        if entry is None:
+            raise CacheMissError(f"{url} is not cached (offline mode)")
+        return cache.response(url, entry, "hit", stream=stream)
+    if entry is not None and cache.is_fresh(entry):
+        return cache.response(url, entry, "hit", stream=stream)
+    headers = {**kwargs.pop("headers", {}), **(cache.conditional_headers(entry) if entry is not None else {})}
+    response = get_session().get(url, headers=headers, stream=True, **kwargs)
+    if response.status_code == 304 and entry is not None:
+        response.close()
+        return cache.revalidated(url, entry, response, stream=stream)
+    if response.status_code != 200:
+        if not stream:
+            response.content # Reads the body so the connection is released
+        return response
+    return cache.store(url, response, stream=stream)
+
+def _create_session() -> requests.Session:
+    retry = Retry(
+        total=_retries,
+        backoff_factor=_backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=_pool_size, pool_maxsize=_pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    # Negotiates brotli/zstd on top of gzip when the decoders are installed
+    session.headers.update(make_headers(accept_encoding=True, user_agent=USER_AGENT))
+    return session
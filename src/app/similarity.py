@@ -0,0 +1,170 @@
+from typing import TypedDict, Iterable
+import numpy as np
+from .matcher import normalize_text
+from .reuse import DEFAULT_THRESHOLD, SHINGLE_SIZE
+from .search import SearchResult
+from .utils import parse_motion
+
+DEFAULT_NUM_PERM = 128
+MIN_RECALL = 0.95
+# Shingles hashed per numpy chunk, bounding memory to about CHUNK_SIZE * num_perm * 8 bytes
+CHUNK_SIZE = 4096
+
+class DuplicateCluster(TypedDict):
+    motions: list[SearchResult]
+    similarity: float
+
+def lsh_params(num_perm: int, threshold: float, recall: float = MIN_RECALL) -> tuple[int, int]:
+    # The most rows per band (fewest false candidates) that still make pairs at the threshold
+    # collide in some band with the given probability; false candidates are removed by verification
+    candidates = [(num_perm // rows, rows) for rows in range(1, num_perm + 1)]
+    return max((params for params in candidates if 1 - (1 - threshold ** params[1]) ** params[0] >= recall), key=lambda params: params[1], default=(num_perm, 1))
+
+class MotionSimilarity:
+    motions: list[SearchResult]
+    threshold: float
+    bands: int
+    rows: int
+    def __init__(self, motions: Iterable[SearchResult], *, threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        self.threshold = threshold
+        self.motions = []
+        # Motions with the same normalized text share one signature
+        self._texts: list[str] = []
+        self._members: list[list[int]] = []
+        text_ids: dict[str, int] = {}
+        for motion in motions:
+            text = normalize_text(parse_motion(motion["motion"]))
+            if not text:
+                continue
+            if text not in text_ids:
+                text_ids[text] = len(self._texts)
+                self._texts.append(text)
+                self._members.append([])
+            self._members[text_ids[text]].append(len(self.motions))
+            self.motions.append(motion)
+        rng = np.random.default_rng(seed)
+        self._shingle_mix = self._odd(rng, SHINGLE_SIZE)
+        # Multiply-shift hashing: ((a * x + b) mod 2^64) >> 32 with odd a
+        self._a = self._odd(rng, num_perm)
+        self._b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+        self._band_mix = self._odd(rng, self.rows)
+        self._hashes, self._offsets = self._shingle_hashes(self._texts)
+        self._shingles: dict[int, frozenset[int]] = {}
+        # Each band is kept sorted by key, so a bucket is a contiguous run
+        keys = self._band_keys(self._signatures(self._hashes, self._offsets))
+        self._order = np.argsort(keys, axis=0, kind="stable")
+        self._sorted_keys = np.take_along_axis(keys, self._order, axis=0)
+
+    def clusters(self) -> list[DuplicateCluster]:
+        parents = list(range(len(self._texts)))
+        def find(i: int) -> int:
+            while parents[i] != i:
+                parents[i] = parents[parents[i]]
+                i = parents[i]
+            return i
+        similarity: dict[int, float] = {}
+        checked: set[tuple[int, int]] = set()
+        for band in range(self.bands):
+            column = self._sorted_keys[:, band]
+            starts = np.flatnonzero(np.concatenate(([True], column[1:] != column[:-1], [True])))
+            for start, end in zip(starts[:-1].tolist(), starts[1:].tolist()):
+                if end - start < 2:
+                    continue
+                bucket = sorted(self._order[start:end, band].tolist())
+                for n, i in enumerate(bucket):
+                    for j in bucket[n+1:]:
+                        if (i, j) in checked:
+                            continue
+                        checked.add((i, j))
+                        score = self._jaccard(self._get_shingles(i), self._get_shingles(j))
+                        if score < self.threshold:
+                            continue
+                        root_i, root_j = find(i), find(j)
+                        if root_i != root_j:
+                            parents[root_j] = root_i
+                            similarity[root_i] = min(similarity.get(root_i, 1.0), similarity.pop(root_j, 1.0), score)
+                        else:
+                            similarity[root_i] = min(similarity.get(root_i, 1.0), score)
+        groups: dict[int, list[int]] = {}
+        for i in range(len(self._texts)):
+            groups.setdefault(find(i), []).append(i)
+        clusters: list[DuplicateCluster] = []
+        for root, texts in groups.items():
+            members = sorted(member for i in texts for member in self._members[i])
+            if len(members) < 2:
+                continue
+            clusters.append(DuplicateCluster(motions=[self.motions[member] for member in members], similarity=similarity.get(root, 1.0)))
+        clusters.sort(key=lambda cluster: (-len(cluster["motions"]), -cluster["similarity"]))
+        return clusters
+
+    def query(self, text: str) -> list[tuple[SearchResult, float]]:
+        text = normalize_text(parse_motion(text))
+        if not text:
+            return []
+        hashes, offsets = self._shingle_hashes([text])
+        shingles = frozenset(hashes.tolist())
+        candidates: set[int] = set()
+        for band, key in enumerate(self._band_keys(self._signatures(hashes, offsets))[0]):
+            column = self._sorted_keys[:, band]
+            start, end = np.searchsorted(column, key, side="left"), np.searchsorted(column, key, side="right")
+            candidates.update(self._order[start:end, band].tolist())
+        matches: list[tuple[SearchResult, float]] = []
+        for i in candidates:
+            score = self._jaccard(shingles, self._get_shingles(i))
+            if score >= self.threshold:
+                matches.extend((self.motions[member], score) for member in self._members[i])
+        matches.sort(key=lambda match: -match[1])
+        return matches
+
+    def _shingle_hashes(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        # Character shingles (Japanese has no spaces between words), hashed as a rolling combination of
+        # code points; texts are padded so every text of length n has n shingles, however short
+        padding = "\0" * (SHINGLE_SIZE - 1)
+        codes = np.frombuffer((padding.join(texts) + padding).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        count = len(codes) - SHINGLE_SIZE + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        for i, mix in enumerate(self._shingle_mix):
+            hashes += codes[i:i+count] * mix
+        hashes ^= hashes >> np.uint64(32)
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        # Shingle positions of each text, skipping the padding between texts
+        positions = np.arange(offsets[-1]) + np.repeat(np.arange(len(texts)) * (SHINGLE_SIZE - 1), lengths)
+        return hashes[positions], offsets
+
+    def _signatures(self, hashes: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        signatures = np.empty((len(offsets) - 1, len(self._a)), dtype=np.uint64)
+        start = 0
+        while start < len(offsets) - 1:
+            # Whole texts per chunk, so each chunk's minimum is final
+            end = int(np.searchsorted(offsets, offsets[start] + CHUNK_SIZE, side="right")) - 1
+            end = min(max(end, start + 1), len(offsets) - 1)
+            # One row per permutation keeps the reduction over contiguous memory
+            chunk = self._a[:, None] * hashes[None, offsets[start]:offsets[end]]
+            chunk += self._b[:, None]
+            chunk >>= np.uint64(32)
+            signatures[start:end] = np.minimum.reduceat(chunk, offsets[start:end] - offsets[start], axis=1).T
+            start = end
+        return signatures
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        bands = signatures[:, :self.bands * self.rows].reshape(len(signatures), self.bands, self.rows)
+        return (bands * self._band_mix).sum(axis=2, dtype=np.uint64)
+
+    def _get_shingles(self, i: int) -> frozenset[int]:
+        shingles = self._shingles.get(i)
+        if shingles is None:
+            shingles = self._shingles[i] = frozenset(self._hashes[self._offsets[i]:self._offsets[i+1]].tolist())
+        return shingles
+
+    @staticmethod
+    def _jaccard(a: frozenset[int], b: frozenset[int]) -> float:
+        return len(a & b) / len(a | b)
+
+    @staticmethod
+    def _odd(rng: np.random.Generator, size: int) -> np.ndarray:
+        return rng.integers(0, 2**63, size, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+def find_duplicates(motions: Iterable[SearchResult], *, threshold: float = DEFAULT_THRESHOLD) -> list[DuplicateCluster]:
+    return MotionSimilarity(motions, threshold=threshold).clusters()
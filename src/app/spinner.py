@@ -0,0 +1,28 @@
+from yaspin import yaspin as _yaspin
+
+class NullSpinner:
+    text: str
+    color: str
+    def __init__(self, text: str = "", color: str = ""):
+        self.text = text
+        self.color = color
+
+    def __enter__(self) -> "NullSpinner":
+        return self
+
+    def __exit__(self, *args) -> bool:
+        return False
+
+    def ok(self, text: str = ""):
+        pass
+
+    def fail(self, text: str = ""):
+        pass
+
+    def write(self, text: str):
+        pass
+
+def yaspin(text: str = "", color: str = "blue", *, quiet: bool = False):
+    if quiet:
+        return NullSpinner(text, color)
+    return _yaspin(text=text, color=color)
@@ -0,0 +1,59 @@
+from pathlib import Path
+import json
+import re
+from .types import TournamentData
+
+FIELDS = ("name", "short", "id")
+
+def trigrams(text: str) -> set[str]:
+    # Digits are left out, so years and edition numbers in Tabbycat names don't count against a match
+    result: set[str] = set()
+    for word in re.findall(r"[^\W\d_]+", text.casefold()):
+        padded = f"  {word} "
+        result.update(padded[i:i+3] for i in range(len(padded) - 2))
+    return result
+
+class TournamentIndex:
+    tournaments: list[TournamentData]
+    def __init__(self, tournaments: list[TournamentData]):
+        self.tournaments = tournaments
+        # Posting lists point at (tournament, field) slots, so each field is scored on its own
+        self._postings: dict[str, list[int]] = {}
+        self._sizes: list[int] = []
+        self._exact: dict[str, list[int]] = {}
+        for i, tournament in enumerate(tournaments):
+            for j, field in enumerate(FIELDS):
+                grams = trigrams(tournament[field])
+                self._sizes.append(len(grams))
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(i * len(FIELDS) + j)
+            for token in {tournament[field].casefold() for field in ("short", "id") if tournament[field]}:
+                self._exact.setdefault(token, []).append(i)
+
+    def rank(self, query: str) -> list[tuple[TournamentData, float]]:
+        # Dice coefficient of trigrams against the best matching field; an exact short name or ID scores 1
+        grams = trigrams(query)
+        counts: dict[int, int] = {}
+        for gram in grams:
+            for slot in self._postings.get(gram, ()):
+                counts[slot] = counts.get(slot, 0) + 1
+        scores: dict[int, float] = {}
+        for slot, count in counts.items():
+            i = slot // len(FIELDS)
+            scores[i] = max(scores.get(i, 0.0), 2 * count / (len(grams) + self._sizes[slot]))
+        for word in set(re.findall(r"\w+", query.casefold())):
+            for i in self._exact.get(word, ()):
+                scores[i] = 1.0
+        return sorted(((self.tournaments[i], score) for i, score in scores.items()), key=lambda match: -match[1])
+
+    def order(self, query: str|None) -> list[TournamentData]:
+        # Ranked matches first, then the rest in list order
+        if not query:
+            return list(self.tournaments)
+        ranked = [tournament for tournament, _ in self.rank(query)]
+        ranked_ids = {id(tournament) for tournament in ranked}
+        return ranked + [tournament for tournament in self.tournaments if id(tournament) not in ranked_ids]
+
+def load_tournament_index(tournament_list_file: Path) -> TournamentIndex:
+    # Built once per TUI run; indexing a thousand tournaments takes tens of milliseconds, so it isn't cached
+    return TournamentIndex(json.loads(tournament_list_file.read_text()))
@@ -1,7 +1,10 @@
 from .app import AutoMotionsApp
 from .interface import TUIInterface
+from .cache import ResponseCache, default_cache_dir
+from . import session
 
 def main():
+    session.configure(cache=ResponseCache(default_cache_dir()/"http"))
     app = AutoMotionsApp(TUIInterface())
     app.run()
 
@@ -1,8 +1,16 @@
-from typing import TypedDict, Literal
+from typing import TypedDict, Literal, NotRequired
 
 TournamentTagList = ["Australasian", "BP", "Asian", "NA", "rookie", "open", "proam", "region:Domestic", "region:World", "region:Asia", "region:Europe", "region:Oceania", "region:America"]
 TournamentTag = Literal["Australasian", "BP", "Asian", "NA", "rookie", "open", "proam", "region:Domestic", "region:World", "region:Asia", "region:Europe", "region:Oceania", "region:America"]
 
+class TournamentSource(TypedDict):
+    # The Tabbycat tournament a tournament year in the motions file was fetched from
+    name: str
+    year: int
+    url: str
+    slug: str
+    type: NotRequired[Literal["NA", "Asian", "BP"]]
+
 class TournamentData(TypedDict):
     id: str
     name: str
@@ -10,6 +18,7 @@ class TournamentData(TypedDict):
     latest: int
     tag: list[TournamentTag]
     url: str
+    sources: NotRequired[list[TournamentSource]]
 
 class Motion(TypedDict):
     url: str
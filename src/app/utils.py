@@ -1,6 +1,14 @@
-from functools import cache
+from typing import Callable
+from functools import lru_cache, partial
+from pathlib import Path
+import os
 import re
+import stat
+import tempfile
 from .types import TournamentYear
+from . import profiling
+
+NORMALIZE_CACHE_SIZE = 8192
 
 SUBSTRINGS_MOTION = [
     (r"\s{2,}", " "),
@@ -63,6 +71,10 @@ SUBSTRINGS_ROUND = [
 ]
 
 def tournament_year_to_lines(tournament_year: TournamentYear) -> list[str]:
+    with profiling.span("normalize", tournament=tournament_year["name"]):
+        return _tournament_year_to_lines(tournament_year)
+
+def _tournament_year_to_lines(tournament_year: TournamentYear) -> list[str]:
     lines: list[str] = []
     if not tournament_year["rounds"]:
         return []
@@ -80,23 +92,114 @@ def tournament_year_to_lines(tournament_year: TournamentYear) -> list[str]:
                     lines.append(f"\t\t\t\t{line}")
     return lines
 
+def stage_text(path: Path, text: str) -> Path:
+    # Written and synced next to the target, ready to be renamed over it
+    with tempfile.NamedTemporaryFile("w", encoding="utf-8", newline="", dir=path.parent, prefix=f".{path.name}.", delete=False) as f:
+        try:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        except BaseException:
+            f.close()
+            os.unlink(f.name)
+            raise
+    try:
+        os.chmod(f.name, stat.S_IMODE(path.stat().st_mode))
+    except FileNotFoundError:
+        os.chmod(f.name, 0o644)
+    return Path(f.name)
+
+def sync_directory(path: Path):
+    # Renames and unlinks in a directory only survive a crash once the directory itself is synced
+    if os.name != "posix":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write_text(path: Path, text: str):
+    # The file is never left half-written
+    os.replace(stage_text(path, text), path)
+
+def _sub(rule: tuple[str, str], guard: str|None = None) -> Callable[[str], str]:
+    sub = partial(re.compile(rule[0], re.IGNORECASE).sub, rule[1])
+    if guard is None:
+        return sub
+    # Every match contains the guard, so the regex scan is skipped when it is absent
+    return lambda text: sub(text) if guard in text else text
+
+def _fuse(rules: list[tuple[str, str]]) -> Callable[[str], str]:
+    # One scan for rules whose matches can't create, destroy or overlap each other's matches
+    replacements: dict[int, str] = {}
+    group = 1
+    for rule in rules:
+        replacements[group] = rule[1]
+        group += re.compile(rule[0]).groups + 1
+    pattern = re.compile("|".join(f"({rule[0]})" for rule in rules), re.IGNORECASE)
+    return partial(pattern.sub, lambda match: replacements[match.lastindex]) # type: ignore
+
+def _replace(rules: list[tuple[str, str]]) -> Callable[[str], str]:
+    # Literal rules without letters don't need the regex engine
+    def replace(text: str) -> str:
+        for old, new in rules:
+            text = text.replace(old, new)
+        return text
+    return replace
+
+# Same order and output as applying each rule in turn with re.sub
+MOTION_PIPELINE: list[Callable[[str], str]] = [
+    _sub(SUBSTRINGS_MOTION[0]), # Whitespace
+    _sub(SUBSTRINGS_MOTION[1]), # TH
+    _sub(SUBSTRINGS_MOTION[2]), # THBT (ends in "T", which can start another TH match)
+    _fuse(SUBSTRINGS_MOTION[3:8]), # THW, THS, THO, THP, THR
+    _sub(SUBSTRINGS_MOTION[8], "."),
+    _replace(SUBSTRINGS_MOTION[9:13]), # Quotes
+    _sub(SUBSTRINGS_MOTION[13], "("),
+    _sub(SUBSTRINGS_MOTION[14], " )"),
+    _sub(SUBSTRINGS_MOTION[15], "&"),
+    _sub(SUBSTRINGS_MOTION[16], "&"),
+]
+
+INFO_PIPELINE: list[Callable[[str], str]] = [
+    _sub((r"\r*\n(?:\r*\n)*", SUBSTRINGS_INFO[0][1]), "\n"), # Same matches as (\r*\n)+ without a capture group per newline
+    _sub(SUBSTRINGS_INFO[1], "  "),
+    _sub(SUBSTRINGS_INFO[2], "("),
+    _sub(SUBSTRINGS_INFO[3], " )"),
+    _replace(SUBSTRINGS_INFO[4:6]), # Quotes
+    _sub(SUBSTRINGS_INFO[6], "&"),
+    _sub(SUBSTRINGS_INFO[7], "&"),
+    _sub(SUBSTRINGS_INFO[8], "<"),
+    _sub(SUBSTRINGS_INFO[9], "&"),
+]
+
+ROUND_PIPELINE: list[Callable[[str], str]] = [
+    _sub(SUBSTRINGS_ROUND[0]),
+    _sub(SUBSTRINGS_ROUND[1]),
+    _fuse(SUBSTRINGS_ROUND[2:7]), # 決勝 family, longest first
+    *[_sub(rule) for rule in SUBSTRINGS_ROUND[7:]],
+]
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def parse_motion(motion: str) -> str:
-    for sub in SUBSTRINGS_MOTION:
-        motion = re.sub(sub[0], sub[1], motion, flags=re.IGNORECASE)
+    for step in MOTION_PIPELINE:
+        motion = step(motion)
     return motion.strip()
 
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def parse_info(info: str) -> str:
-    for sub in SUBSTRINGS_INFO:
-        info = re.sub(sub[0], sub[1], info, flags=re.IGNORECASE)
+    for step in INFO_PIPELINE:
+        info = step(info)
     return info.strip()
 
-@cache
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def parse_round(round: str) -> str:
-    for sub in SUBSTRINGS_ROUND:
-        round = re.sub(sub[0], sub[1], round, flags=re.IGNORECASE)
+    for step in ROUND_PIPELINE:
+        round = step(round)
     return round.strip()
 
-@cache
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def parse_round_table(round: str) -> str:
     round = round.split(":")[0].strip()
     parsed = parse_round(round)
@@ -104,4 +207,3 @@ def parse_round_table(round: str) -> str:
     if match:
         return match.group(1)
     return parsed
-        
\ No newline at end of file
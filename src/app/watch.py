@@ -0,0 +1,88 @@
+from typing import Optional
+from urllib.parse import urljoin
+import requests
+from .interface.types import TabbycatContext
+from .motions import MotionManager
+from .parser import iter_round_tiles
+from .types import Round, TournamentYear
+from . import session, profiling
+
+class TournamentWatcher(MotionManager):
+    # Keeps a tournament in memory between polls. Each endpoint is requested with the validators of its last response,
+    # and only rounds and motions with new URLs are added, so an unchanged tournament costs three 304s or fewer
+    def __init__(self, ctx: TabbycatContext):
+        super().__init__(ctx, quiet=True, stream=True)
+        self._validators: dict[str, tuple[str|None, str|None]] = {}
+        # Stats of each round as last returned, so a page read again only reports rounds whose stats changed
+        self._stats: dict[str, list[list[tuple[str, tuple[int, ...]]]]] = {}
+        self._requested: set[str] = set()
+        self._changed: dict[str, Round] = {}
+        # Why the statistics page couldn't be read on the last poll, if it couldn't
+        self.statistics_error: Optional[requests.RequestException] = None
+
+    def poll(self) -> list[Round]:
+        # Rounds whose motions or statistics changed since the last poll that returned. Changes are kept until then,
+        # since the endpoints that reported them answer 304 from now on
+        self.statistics_error = None
+        slug = self.ctx["tournament_slug"]
+        rounds_response = self._get_if_changed(f"/api/v1/tournaments/{slug}/rounds")
+        if rounds_response is not None:
+            with profiling.span("decode_json", bytes=len(rounds_response.content)):
+                self._add_rounds(rounds_response.json())
+        motions_response = self._get_if_changed(f"/api/v1/tournaments/{slug}/motions")
+        if motions_response is not None:
+            with profiling.span("decode_json", bytes=len(motions_response.content)):
+                self._changed.update((round["url"], round) for round in self._add_motions(motions_response.json()))
+        self._sort_rounds()
+        # Statistics change as late ballots are confirmed, so the page is requested on every poll, which costs a 304 while
+        # it is unchanged. A round released since the last request may already be on an unchanged page, so that request
+        # isn't conditional
+        released = {round["name"] for round in self.rounds if round["motions"]}
+        if released:
+            try:
+                statistics_response = self._get_if_changed(f"/{slug}/motions/statistics/", stream=True, conditional=released <= self._requested)
+                if statistics_response is not None:
+                    with statistics_response:
+                        self._scrape_round_tiles(iter_round_tiles(self._iter_text(statistics_response), rounds=released))
+                self._requested = released
+            except requests.RequestException as e:
+                # New motions are still returned, and the page is requested again on the next poll
+                self.statistics_error = e
+        changed = sorted(self._changed.values(), key=lambda x: x["seq"])
+        self._changed = {}
+        return changed
+
+    def tournament_year(self) -> TournamentYear:
+        assert self.ctx["tournament_name"], "Tournament name not found"
+        return {
+            "name": self.ctx["tournament_name"],
+            "rounds": [round for round in self.rounds if round["motions"]]
+        }
+
+    def _complete_round(self, round: Round):
+        # Called by _scrape_round_tiles once the statistics of a round have been read
+        stats = [[(stat["type_"], tuple(stat["value"])) for stat in round_motion["stats"]] for round_motion in round["motions"]]
+        if self._stats.get(round["url"]) != stats:
+            self._stats[round["url"]] = stats
+            self._changed[round["url"]] = round
+
+    def _get_if_changed(self, path: str, *, stream: bool = False, conditional: bool = True) -> Optional[requests.Response]:
+        url = urljoin(self.ctx["base_url"], path)
+        headers: dict[str, str] = {}
+        etag, last_modified = self._validators.get(url, (None, None)) if conditional else (None, None)
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+        response = session.get(url, headers=headers, stream=stream)
+        if response.status_code == 304:
+            response.close()
+            return None
+        response.raise_for_status()
+        validators = (response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        # With the response cache on, a 304 arrives as the cached body under the same validators
+        if any(validators) and validators == (etag, last_modified):
+            response.close()
+            return None
+        self._validators[url] = validators
+        return response